@@ -0,0 +1,142 @@
+# backend/app/catalog.py
+# Embedded SQLite catalog of stored datasets and the uploads (file_ids) pointing at them
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    dataset_id   TEXT PRIMARY KEY,
+    content_hash TEXT,
+    format       TEXT,
+    size_bytes   INTEGER,
+    num_rows     INTEGER,
+    num_columns  INTEGER,
+    columns      TEXT,
+    version      INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS datasets_content_hash ON datasets (content_hash);
+CREATE TABLE IF NOT EXISTS files (
+    file_id     TEXT PRIMARY KEY,
+    dataset_id  TEXT NOT NULL REFERENCES datasets (dataset_id) ON DELETE CASCADE,
+    filename    TEXT,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dataset_id ON files (dataset_id);
+CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at);
+"""
+
+
+class Catalog:
+    """
+    Metadata for every stored dataset (content hash, format, size, shape, columns and a
+    version bumped on each rewrite) and every upload pointing at one. SQLite in WAL mode
+    lets all uvicorn workers read concurrently; each thread keeps its own connection.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._db() as db:
+            db.executescript(SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    def add_dataset(self, dataset_id: str, created_at: float, content_hash: Optional[str] = None,
+                    fmt: Optional[str] = None, size_bytes: Optional[int] = None, version: int = 0) -> None:
+        """Register a stored dataset; a no-op when it is already known."""
+        with self._db() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO datasets (dataset_id, content_hash, format, size_bytes, version, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (dataset_id, content_hash, fmt, size_bytes, version, created_at))
+
+    def record_ingest(self, dataset_id: str, profile: Dict[str, Any]) -> int:
+        """Store the shape and columns of a freshly (re)built dataset and bump its version."""
+        columns = [{"name": name, "dtype": col["dtype"]} for name, col in profile["columns"].items()]
+        source = profile.get("source", {})
+        with self._db() as db:
+            db.execute(
+                "UPDATE datasets SET num_rows = ?, num_columns = ?, columns = ?, version = version + 1, "
+                "format = COALESCE(?, format), size_bytes = COALESCE(?, size_bytes), "
+                "content_hash = COALESCE(?, content_hash) WHERE dataset_id = ?",
+                (profile["num_rows"], profile["num_columns"], json.dumps(columns), source.get("format"),
+                 source.get("size_bytes"), source.get("content_hash"), dataset_id))
+        return self.version(dataset_id)
+
+    def version(self, dataset_id: str) -> Optional[int]:
+        row = self._db().execute("SELECT version FROM datasets WHERE dataset_id = ?", (dataset_id,)).fetchone()
+        return row["version"] if row else None
+
+    def add_file(self, file_id: str, dataset_id: str, filename: Optional[str], created_at: float) -> None:
+        with self._db() as db:
+            db.execute("INSERT INTO files (file_id, dataset_id, filename, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                       (file_id, dataset_id, filename, created_at, created_at))
+
+    def move_file(self, file_id: str, dataset_id: str) -> None:
+        """Point an upload at another dataset (its rows were appended to)."""
+        with self._db() as db:
+            db.execute("UPDATE files SET dataset_id = ? WHERE file_id = ?", (dataset_id, file_id))
+
+    def lookup(self, file_id: str) -> Optional[sqlite3.Row]:
+        """``dataset_id`` and ``last_access`` of an upload, or None."""
+        return self._db().execute("SELECT dataset_id, last_access FROM files WHERE file_id = ?", (file_id,)).fetchone()
+
+    def touch(self, file_id: str, now: float) -> None:
+        with self._db() as db:
+            db.execute("UPDATE files SET last_access = ? WHERE file_id = ?", (now, file_id))
+
+    def remove_file(self, file_id: str) -> None:
+        with self._db() as db:
+            db.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+    def file_count(self, dataset_id: str) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM files WHERE dataset_id = ?", (dataset_id,)).fetchone()[0]
+
+    def remove_dataset(self, dataset_id: str) -> None:
+        """Forget a dataset together with every upload pointing at it."""
+        with self._db() as db:
+            db.execute("DELETE FROM datasets WHERE dataset_id = ?", (dataset_id,))
+
+    def last_access(self) -> Dict[str, float]:
+        """Most recent use of each dataset through any of its uploads (its creation if it has none)."""
+        rows = self._db().execute(
+            "SELECT d.dataset_id, MAX(COALESCE(f.last_access, d.created_at)) AS last_access "
+            "FROM datasets d LEFT JOIN files f ON f.dataset_id = d.dataset_id GROUP BY d.dataset_id")
+        return {row["dataset_id"]: row["last_access"] for row in rows}
+
+    def dataset_last_access(self, dataset_id: str) -> Optional[float]:
+        """``last_access`` of one dataset, or None when it is not catalogued."""
+        row = self._db().execute(
+            "SELECT MAX(COALESCE(f.last_access, d.created_at)) AS last_access "
+            "FROM datasets d LEFT JOIN files f ON f.dataset_id = d.dataset_id WHERE d.dataset_id = ?",
+            (dataset_id,)).fetchone()
+        return row["last_access"] if row else None
+
+    def list_files(self, limit: int, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of uploads, newest first, joined with their dataset metadata; plus the total count."""
+        rows = self._db().execute(
+            "SELECT f.file_id, f.filename, f.created_at, f.last_access, d.dataset_id, d.content_hash, d.format, "
+            "d.size_bytes, d.num_rows, d.num_columns, d.columns, d.version "
+            "FROM files f JOIN datasets d ON d.dataset_id = f.dataset_id "
+            "ORDER BY f.created_at DESC, f.file_id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        total = self._db().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        files = []
+        for row in rows:
+            entry = dict(row)
+            entry["columns"] = json.loads(entry["columns"]) if entry["columns"] else None
+            files.append(entry)
+        return files, total
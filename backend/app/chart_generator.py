@@ -1,90 +1,124 @@
 # backend/app/chart_generator.py
 # Helper to generate Plotly chart specs from data
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import json
+from app.column_roles import frame_columns, role_index
+from app.correlations import CorrelationMatrix
+from app.frame_statistics import frame_outliers
+from app.time_rollups import TimeRollups
 
-def generate_plotly_spec(vibe: str, df: pd.DataFrame, x_col: str = None, y_col: str = None, group_col: str = None) -> Dict[str, Any]:
-    """Generate a Plotly chart specification based on vibe and data."""
-    
+Roles = Tuple[Optional[str], Optional[str], Optional[str]]
+
+def _auto_roles(vibe: str, df: pd.DataFrame, roles: Optional[Dict[str, Any]] = None,
+                correlations: Optional[CorrelationMatrix] = None) -> Optional[Roles]:
+    """
+    Pick (x, y, color) columns for a vibe from the dataset's persisted role index, or
+    from column names and dtypes alone when there is none (a zero-row frame carrying the
+    schema works as well as the data). Values are plotted from the measure columns, the
+    sales column first and identifiers such as customer_id left out. Scatter plots pair
+    the most strongly correlated measures, from ``correlations`` or the rows of ``df``.
+    Returns None when there are no suitable columns.
+    """
+    if roles is None:
+        roles = role_index(frame_columns(df))
+    cat_cols, num_cols, date_cols = roles['categorical'], roles['measures'], roles['dates']
     if vibe == "line":
-        if x_col and y_col:
-            fig = px.line(df, x=x_col, y=y_col, markers=True)
-        else:
-            # Auto-detect columns
-            date_cols = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c]) or 'date' in c.lower()]
-            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if date_cols and numeric_cols:
-                fig = px.line(df, x=date_cols[0], y=numeric_cols[0], markers=True)
-            elif len(df.columns) >= 2:
-                fig = px.line(df, x=df.columns[0], y=df.columns[1], markers=True)
-            else:
-                return {"error": "Insufficient columns for line chart"}
-        
+        if date_cols and num_cols:
+            return date_cols[0], num_cols[0], None
+        if len(df.columns) >= 2:
+            return df.columns[0], df.columns[1], None
     elif vibe == "grouped_bar":
-        if x_col and y_col:
-            if group_col:
-                fig = px.bar(df, x=x_col, y=y_col, color=group_col, barmode='group')
-            else:
-                fig = px.bar(df, x=x_col, y=y_col)
-        else:
-            # Auto-detect
-            cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-            num_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if cat_cols and num_cols:
-                if len(cat_cols) > 1:
-                    fig = px.bar(df, x=cat_cols[0], y=num_cols[0], color=cat_cols[1], barmode='group')
-                else:
-                    fig = px.bar(df, x=cat_cols[0], y=num_cols[0])
-            else:
-                return {"error": "Need categorical and numeric columns"}
-    
+        if cat_cols and num_cols:
+            return cat_cols[0], num_cols[0], cat_cols[1] if len(cat_cols) > 1 else None
     elif vibe == "histogram":
-        if y_col:
-            fig = px.histogram(df, x=y_col, nbins=30)
-        else:
-            num_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if num_cols:
-                fig = px.histogram(df, x=num_cols[0], nbins=30)
-            else:
-                return {"error": "Need numeric column for histogram"}
-    
+        if num_cols:
+            return num_cols[0], None, None
     elif vibe == "scatter":
-        if x_col and y_col:
-            fig = px.scatter(df, x=x_col, y=y_col)
-        else:
-            num_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if len(num_cols) >= 2:
-                fig = px.scatter(df, x=num_cols[0], y=num_cols[1])
-            else:
-                return {"error": "Need at least 2 numeric columns"}
-    
+        if len(num_cols) >= 2:
+            if correlations is None and len(df):
+                correlations = CorrelationMatrix.for_frame(df, num_cols)
+            pairs = correlations.top_pairs(1, min_abs=0, columns=num_cols) if correlations is not None else []
+            if pairs:
+                return pairs[0]['x'], pairs[0]['y'], None
+            return num_cols[0], num_cols[1], None
     elif vibe == "horizontal_bar":
-        if x_col and y_col:
-            fig = px.bar(df, y=x_col, x=y_col, orientation='h')
-        else:
-            cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-            num_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if cat_cols and num_cols:
-                df_sorted = df.sort_values(num_cols[0], ascending=True)
-                fig = px.bar(df_sorted, y=cat_cols[0], x=num_cols[0], orientation='h')
-            else:
-                return {"error": "Need categorical and numeric columns"}
-    
+        if cat_cols and num_cols:
+            return cat_cols[0], num_cols[0], None
     elif vibe == "stacked_bar":
-        if x_col and y_col and group_col:
-            fig = px.bar(df, x=x_col, y=y_col, color=group_col, barmode='stack')
-        else:
-            cat_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-            num_cols = df.select_dtypes(include=['number']).columns.tolist()
-            if len(cat_cols) >= 2 and num_cols:
-                fig = px.bar(df, x=cat_cols[0], y=num_cols[0], color=cat_cols[1], barmode='stack')
-            else:
-                return {"error": "Need 2 categorical and 1 numeric column"}
+        if len(cat_cols) >= 2 and num_cols:
+            return cat_cols[0], num_cols[0], cat_cols[1]
+    return None
+
+def _resolve_roles(vibe: str, df: pd.DataFrame, x_col: str = None, y_col: str = None, group_col: str = None,
+                   roles: Optional[Dict[str, Any]] = None,
+                   correlations: Optional[CorrelationMatrix] = None) -> Optional[Roles]:
+    """Explicit column selections when the vibe has enough of them, else auto-detected ones."""
+    if vibe == "histogram":
+        return (y_col, None, None) if y_col else _auto_roles(vibe, df, roles)
+    if vibe == "stacked_bar":
+        return (x_col, y_col, group_col) if x_col and y_col and group_col else _auto_roles(vibe, df, roles)
+    if x_col and y_col:
+        return x_col, y_col, group_col if vibe == "grouped_bar" else None
+    return _auto_roles(vibe, df, roles, correlations)
+
+def chart_columns(vibe: str, schema: pd.DataFrame, x_col: str = None, y_col: str = None, group_col: str = None,
+                  roles: Optional[Dict[str, Any]] = None,
+                  correlations: Optional[CorrelationMatrix] = None) -> Optional[List[str]]:
+    """
+    Columns a chart needs, resolved against the persisted schema (a zero-row frame),
+    role index and correlations so only those have to be loaded. None means the chart
+    uses every column.
+    """
+    if vibe == "choropleth":
+        return None
+    picked = _resolve_roles(vibe, schema, x_col, y_col, group_col, roles, correlations)
+    if picked is None:
+        return []
+    needed = {c for c in picked if c is not None}
+    return [c for c in schema.columns if c in needed]
+
+def rollup_chart_frame(vibe: str, schema: pd.DataFrame, rollups: Optional[TimeRollups], x_col: str = None,
+                       y_col: str = None, roles: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+    """
+    Rows for a line chart of a numeric column over the date column, read from the
+    dataset's time rollups (the column summed per day, week or month) instead of the
+    data. None when the chart plots something the rollups do not cover.
+    """
+    if vibe != "line" or rollups is None:
+        return None
+    picked = _resolve_roles(vibe, schema, x_col, y_col, None, roles)
+    if picked is None or picked[0] != rollups.date_col or picked[1] not in rollups.numeric:
+        return None
+    return rollups.line_frame(picked[1])
+
+def _chart_outliers(df: pd.DataFrame, columns: List[str]) -> Dict[str, Any]:
+    """
+    Outliers among the plotted rows of numeric ``columns`` (the ``highlight_outliers``
+    constraint): the positions of the rows flagged in any of them, and the fences per column.
+    """
+    numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    found = frame_outliers(df, numeric, max_rows=len(df))
+    rows = sorted({row for col in found.values() for row in col['rows']})
+    return {
+        "rows": rows,
+        "columns": {col: {k: v for k, v in info.items() if k != 'rows'} for col, info in found.items()}
+    }
+
+def generate_plotly_spec(vibe: str, df: pd.DataFrame, x_col: str = None, y_col: str = None, group_col: str = None,
+                         roles: Optional[Dict[str, Any]] = None,
+                         correlations: Optional[CorrelationMatrix] = None) -> Dict[str, Any]:
+    """
+    Generate a Plotly chart specification based on vibe and data.
+    ``roles`` is the dataset's role index (``column_roles.role_index``); without it
+    columns are picked from ``df``'s dtypes. ``correlations`` (the dataset's kept
+    matrix) picks the scatter pair; without it the pair is correlated from ``df``.
+    """
     
-    elif vibe == "choropleth":
+    if vibe == "choropleth":
         # Return placeholder for map data
         return {
             "library": "mapbox",
@@ -92,6 +126,59 @@ def generate_plotly_spec(vibe: str, df: pd.DataFrame, x_col: str = None, y_col:
             "message": "Choropleth data ready for map rendering"
         }
     
+    explicit = bool(x_col and y_col)
+    picked = _resolve_roles(vibe, df, x_col, y_col, group_col, roles, correlations)
+    outliers = None
+    
+    if vibe == "line":
+        if picked is None:
+            return {"error": "Insufficient columns for line chart"}
+        fig = px.line(df, x=picked[0], y=picked[1], markers=True)
+    
+    elif vibe == "grouped_bar":
+        if picked is None:
+            return {"error": "Need categorical and numeric columns"}
+        x, y, color = picked
+        if color:
+            fig = px.bar(df, x=x, y=y, color=color, barmode='group')
+        else:
+            fig = px.bar(df, x=x, y=y)
+    
+    elif vibe == "histogram":
+        if picked is None:
+            return {"error": "Need numeric column for histogram"}
+        fig = px.histogram(df, x=picked[0], nbins=30)
+        outliers = _chart_outliers(df, [picked[0]])
+        for fences in outliers["columns"].values():
+            for bound in ("low", "high"):
+                if np.isfinite(fences[bound]):
+                    fig.add_vline(x=fences[bound], line_dash="dash", line_color="crimson")
+    
+    elif vibe == "scatter":
+        if picked is None:
+            return {"error": "Need at least 2 numeric columns"}
+        fig = px.scatter(df, x=picked[0], y=picked[1])
+        outliers = _chart_outliers(df, [picked[0], picked[1]])
+        if outliers["rows"]:
+            flagged = df.iloc[outliers["rows"]]
+            fig.add_scatter(x=flagged[picked[0]], y=flagged[picked[1]], mode="markers", name="Outliers",
+                            marker=dict(color="crimson", size=10, symbol="circle-open"))
+    
+    elif vibe == "horizontal_bar":
+        if picked is None:
+            return {"error": "Need categorical and numeric columns"}
+        category, value, _ = picked
+        if explicit:
+            fig = px.bar(df, y=category, x=value, orientation='h')
+        else:
+            df_sorted = df.sort_values(value, ascending=True)
+            fig = px.bar(df_sorted, y=category, x=value, orientation='h')
+    
+    elif vibe == "stacked_bar":
+        if picked is None:
+            return {"error": "Need 2 categorical and 1 numeric column"}
+        fig = px.bar(df, x=picked[0], y=picked[1], color=picked[2], barmode='stack')
+    
     else:
         return {"error": f"Unknown vibe: {vibe}"}
     
@@ -104,8 +191,11 @@ def generate_plotly_spec(vibe: str, df: pd.DataFrame, x_col: str = None, y_col:
     
     # Convert to JSON-serializable dict using plotly's to_dict method
     fig_json = json.loads(fig.to_json())
-    return {
+    spec = {
         "library": "plotly",
         "data": fig_json.get('data', []),
         "layout": fig_json.get('layout', {})
     }
+    if outliers is not None:
+        spec["outliers"] = outliers
+    return spec
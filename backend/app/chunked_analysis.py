@@ -0,0 +1,150 @@
+# backend/app/chunked_analysis.py
+# Out-of-core analysis: exact quantiles and outliers streamed from the Parquet store
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from app.frame_statistics import OUTLIER_MAX_ROWS, numeric_block, outlier_fences
+
+# Memory one analysis may hold in decoded rows; batches are sized to fit it
+ANALYSIS_MEMORY_BYTES = int(float(os.getenv("ANALYSIS_MEMORY_MB", 256)) * 1024 * 1024)
+# Decoded pandas columns are larger than their uncompressed Parquet pages (object text, indexes)
+PANDAS_OVERHEAD = 3
+MIN_BATCH_ROWS = 1024
+# Buckets per histogram pass of the exact quantile search
+MEDIAN_BUCKETS = 1024
+
+
+def batch_rows(paths: List[Path], columns: Optional[List[str]] = None,
+               memory_bytes: int = ANALYSIS_MEMORY_BYTES) -> int:
+    """Rows per batch so one decoded batch of ``columns`` stays within ``memory_bytes``."""
+    rows, size = 0, 0
+    for path in paths:
+        meta = pq.ParquetFile(path).metadata
+        wanted = {meta.schema.column(i).name for i in range(meta.num_columns)} if columns is None else set(columns)
+        for g in range(meta.num_row_groups):
+            group = meta.row_group(g)
+            rows += group.num_rows
+            size += sum(group.column(i).total_uncompressed_size for i in range(group.num_columns)
+                        if group.column(i).path_in_schema in wanted)
+    if not rows or not size:
+        return max(MIN_BATCH_ROWS, rows)
+    return max(MIN_BATCH_ROWS, int(memory_bytes / (size / rows * PANDAS_OVERHEAD)))
+
+
+def iter_batches(paths: List[Path], columns: Optional[List[str]] = None,
+                 memory_bytes: int = ANALYSIS_MEMORY_BYTES) -> Iterator[pd.DataFrame]:
+    """The stored rows of every Parquet part as pandas batches bounded by ``memory_bytes``."""
+    size = batch_rows(paths, columns, memory_bytes)
+    for path in paths:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=size, columns=columns):
+            yield batch.to_pandas()
+
+
+def _values(batch: pd.DataFrame, column: str) -> np.ndarray:
+    values = batch[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def chunked_quantiles(paths: List[Path], column: str, quantiles: List[float],
+                      memory_bytes: int = ANALYSIS_MEMORY_BYTES) -> List[Optional[float]]:
+    """
+    Exact quantiles of a numeric column (interpolated between ranks like pandas) without
+    holding it in memory. Each pass histograms the values still in play around every
+    wanted rank and keeps the bucket holding it, until the bucket fits in memory and is
+    sorted directly. Ranks whose buckets coincide share the histogram.
+    """
+    lo, hi, count = np.inf, -np.inf, 0
+    for batch in iter_batches(paths, [column], memory_bytes):
+        values = _values(batch, column)
+        if len(values):
+            lo, hi, count = min(lo, values.min()), max(hi, values.max()), count + len(values)
+    if not count:
+        return [None] * len(quantiles)
+    positions = [(count - 1) * q for q in quantiles]
+    # Rank -> values in play lie in [low, high]; ``below`` are smaller
+    todo = {rank: (lo, hi, 0) for p in positions for rank in {int(np.floor(p)), int(np.ceil(p))}}
+    found: Dict[int, float] = {}
+    while todo:
+        ranges: Dict[Tuple[float, float, int], List[int]] = {}
+        for rank, state in todo.items():
+            if state[0] == state[1]:
+                found[rank] = float(state[0])
+            else:
+                ranges.setdefault(state, []).append(rank)
+        todo = {}
+        limit = max(MIN_BATCH_ROWS, memory_bytes // 8 // max(len(ranges), 1))
+        counts = {state: np.zeros(MEDIAN_BUCKETS, dtype=np.int64) for state in ranges}
+        in_play: Dict[Tuple[float, float, int], List[np.ndarray]] = {state: [] for state in ranges}
+        held = dict.fromkeys(ranges, 0)
+        bounds = {state: [np.inf, -np.inf] for state in ranges}
+        for batch in iter_batches(paths, [column], memory_bytes) if ranges else ():
+            all_values = _values(batch, column)
+            for state in ranges:
+                low, high, _ = state
+                values = all_values[(all_values >= low) & (all_values <= high)]
+                counts[state] += np.histogram(values, bins=MEDIAN_BUCKETS, range=(low, high))[0]
+                held[state] += len(values)
+                if held[state] <= limit:
+                    in_play[state].append(values)
+                if len(values):
+                    bounds[state] = [min(bounds[state][0], values.min()), max(bounds[state][1], values.max())]
+        for state, ranks in ranges.items():
+            low, high, below = state
+            if held[state] <= limit:
+                ordered = np.sort(np.concatenate(in_play[state]))
+                found.update((rank, float(ordered[rank - below])) for rank in ranks)
+                continue
+            edges = np.histogram_bin_edges([], bins=MEDIAN_BUCKETS, range=(low, high))
+            cumulative = np.cumsum(counts[state])
+            for rank in ranks:
+                bucket = int(np.searchsorted(cumulative, rank - below, side="right"))
+                # Narrow to the bucket, then to the values actually in it on the next pass
+                todo[rank] = (max(edges[bucket], bounds[state][0]),
+                              min(np.nextafter(edges[bucket + 1], -np.inf) if bucket < MEDIAN_BUCKETS - 1 else edges[-1],
+                                  bounds[state][1]),
+                              below + (int(cumulative[bucket - 1]) if bucket else 0))
+    result = []
+    for p in positions:
+        lower, upper = found[int(np.floor(p))], found[int(np.ceil(p))]
+        result.append(lower + (upper - lower) * (p - np.floor(p)))
+    return result
+
+
+def chunked_outliers(paths: List[Path], quartiles: Dict[str, Tuple[float, float]],
+                     max_rows: int = OUTLIER_MAX_ROWS, memory_bytes: int = ANALYSIS_MEMORY_BYTES,
+                     checkpoint: Optional[Callable[[], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    ``frame_outliers`` over every stored row: the fences come from the known quartiles
+    (column -> (q1, q3)) and the columns are scanned one batch at a time, keeping the
+    ``max_rows`` most extreme positions per column. ``checkpoint`` runs between batches.
+    """
+    columns = list(quartiles)
+    if not columns:
+        return {}
+    q1, q3 = np.array([quartiles[c] for c in columns], dtype=np.float64).T
+    low, high = outlier_fences(q1, q3)
+    counts = np.zeros(len(columns), dtype=np.int64)
+    # Per column: (how far beyond the fence, row position) of the most extreme rows so far
+    extreme: List[Tuple[np.ndarray, np.ndarray]] = [(np.empty(0), np.empty(0, dtype=np.int64))] * len(columns)
+    offset = 0
+    for batch in iter_batches(paths, columns, memory_bytes):
+        if checkpoint is not None:
+            checkpoint()
+        block = numeric_block(batch, columns)
+        # NaN (null) compares false, so nulls are never flagged
+        mask = (block < low[:, None]) | (block > high[:, None])
+        counts += mask.sum(axis=1)
+        for i in np.flatnonzero(mask.any(axis=1)):
+            rows = np.flatnonzero(mask[i])
+            beyond = np.maximum(low[i] - block[i, rows], block[i, rows] - high[i])
+            beyond, rows = np.concatenate([extreme[i][0], beyond]), np.concatenate([extreme[i][1], rows + offset])
+            # Stable on the concatenation, so ties keep the earlier row first
+            keep = np.argsort(-beyond, kind="stable")[:max_rows]
+            extreme[i] = (beyond[keep], rows[keep])
+        offset += len(batch)
+    return {columns[i]: {'count': int(counts[i]), 'low': float(low[i]), 'high': float(high[i]),
+                         'rows': extreme[i][1].tolist()}
+            for i in np.flatnonzero(counts)}
@@ -0,0 +1,119 @@
+# backend/app/column_roles.py
+# Semantic column-role index: which column plays revenue, category, date, ... computed once per dataset
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+# Keywords each semantic role looks for in column names, in order of preference
+REVENUE_KEYWORDS = ['revenue', 'sales', 'amount', 'price', 'total']
+SALES_KEYWORDS = ['revenue', 'sales', 'amount', 'price']
+CATEGORY_KEYWORDS = ['category', 'product', 'type', 'segment']
+STATUS_KEYWORDS = ['status', 'state', 'order_status']
+GEO_KEYWORDS = ['location', 'city', 'region', 'zone', 'state', 'country']
+CUSTOMER_KEYWORDS = ['customer', 'customer_id', 'user_id', 'client']
+DATE_KEYWORDS = ['date', 'time', 'created', 'order_date']
+ROLE_KEYWORDS = {
+    'revenue': REVENUE_KEYWORDS,
+    'sales': SALES_KEYWORDS,
+    'category': CATEGORY_KEYWORDS,
+    'status': STATUS_KEYWORDS,
+    'geography': GEO_KEYWORDS,
+    'customer': CUSTOMER_KEYWORDS,
+    'date': DATE_KEYWORDS
+}
+# Roles the business insights (and their persisted aggregates) read
+INSIGHT_ROLES = ('revenue', 'sales', 'category', 'status', 'geography', 'customer')
+# A status column holds a handful of states, not free text
+STATUS_MAX_CARDINALITY = 50
+# Integer columns named like this are keys even when their values repeat (customer_id in an orders table)
+KEY_SUFFIXES = ("_id", "_uuid", "_key", "_code")
+
+
+def _fits(role: str, col: Dict[str, Any]) -> bool:
+    """Whether the value evidence of a column (kind, structural role, cardinality) allows ``role``."""
+    kind, structural, cardinality = col["kind"], col.get("role"), col.get("cardinality")
+    if role in ('revenue', 'sales', 'price'):
+        return kind in ('int', 'float') and structural != 'identifier'
+    if role == 'date':
+        return kind == 'datetime'
+    if role == 'customer':
+        return kind in ('int', 'string')
+    # Grouping roles: a few repeated labels, never a date, a continuous measure or a key
+    if kind not in ('string', 'bool', 'int') or structural == 'identifier':
+        return False
+    return not (role == 'status' and cardinality is not None and cardinality > STATUS_MAX_CARDINALITY)
+
+
+def _match(role: str, columns: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """First column whose name contains a keyword of ``role`` (case-insensitive) and whose values fit it."""
+    for keyword in ROLE_KEYWORDS[role]:
+        for name, col in columns.items():
+            if keyword in name.lower() and _fits(role, col):
+                return name
+    return None
+
+
+def role_index(columns: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Semantic roles of a dataset's columns from their names plus value evidence.
+    ``columns`` maps each name to its profile entry (``kind`` and, when known, the
+    structural ``role`` and ``cardinality``). Besides one column per business role the
+    index lists the numeric, categorical and date columns charts are drawn from.
+    """
+    index: Dict[str, Any] = {role: _match(role, columns) for role in ROLE_KEYWORDS}
+    if index['date'] is None:
+        index['date'] = next((name for name, col in columns.items() if col["kind"] == 'datetime'), None)
+    index['price'] = [name for name, col in columns.items() if 'price' in name.lower() and _fits('price', col)]
+    index['numeric'] = [name for name, col in columns.items() if col["kind"] in ('int', 'float')]
+    index['categorical'] = [name for name, col in columns.items() if col["kind"] == 'string']
+    index['dates'] = [name for name, col in columns.items() if col["kind"] == 'datetime' or 'date' in name.lower()]
+    index['measures'] = measure_columns(index, columns)
+    return index
+
+
+def measure_columns(index: Dict[str, Any], columns: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Numeric columns of a role index that hold measures: the sales columns first, then the
+    rest. With the profile entries of the ``columns``, identifiers (keys, ids) are left out.
+    """
+    preferred = [index[role] for role in ('sales', 'revenue') if index.get(role)]
+    return [name for name in dict.fromkeys(preferred + index['numeric'])
+            if columns is None or columns[name].get("role") != 'identifier']
+
+
+def frame_columns(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Evidence of a frame that has no profile (dtypes and names only, so a zero-row schema
+    frame works): integer keys are marked as identifiers.
+    """
+    def kind(dtype) -> str:
+        if pd.api.types.is_bool_dtype(dtype):
+            return 'bool'
+        if pd.api.types.is_integer_dtype(dtype):
+            return 'int'
+        if pd.api.types.is_float_dtype(dtype):
+            return 'float'
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return 'datetime'
+        return 'string'
+    columns = {name: {"kind": kind(dtype)} for name, dtype in df.dtypes.items()}
+    for name, col in columns.items():
+        if col["kind"] == 'int' and str(name).lower().endswith(KEY_SUFFIXES):
+            col["role"] = 'identifier'
+    return columns
+
+
+def insight_roles(index: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """The part of a role index the business insights read (role -> column)."""
+    return {role: index[role] for role in INSIGHT_ROLES}
+
+
+def dataset_roles(df: pd.DataFrame, profile: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The role index persisted in ``profile``, or one derived from the dtypes of ``df``."""
+    if profile is not None and "semantic_roles" in profile:
+        return profile["semantic_roles"]
+    return role_index(frame_columns(df))
+
+
+def describe_roles(index: Dict[str, Any]) -> List[str]:
+    """``role: column`` for every business role that was found, for prompts and context."""
+    return [f"{role}: {index[role]}" for role in ROLE_KEYWORDS if index.get(role)]
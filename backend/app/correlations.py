@@ -0,0 +1,162 @@
+# backend/app/correlations.py
+# Numeric correlation matrix accumulated chunk by chunk as one standardized BLAS product
+import os
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+from app.column_roles import measure_columns
+
+# Numeric columns correlated per dataset (the sales and revenue columns come first)
+CORRELATION_MAX_COLUMNS = int(os.getenv("CORRELATION_MAX_COLUMNS", 256))
+# In-memory frames taller than this are correlated on a uniform sample of as many rows (0 uses every row);
+# the matrices kept at ingest always cover every row
+CORRELATION_SAMPLE_ROWS = int(os.getenv("CORRELATION_SAMPLE_ROWS", 250_000))
+# Consecutive rows drawn together when sampling
+SAMPLE_RUN_ROWS = 1024
+# Rows converted and multiplied at a time
+CORRELATION_CHUNK_ROWS = 65536
+# Pairs at least this strongly correlated (either sign) are reported
+STRONG_CORRELATION = 0.5
+
+
+def correlation_columns(index: Dict[str, Any], columns: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """Measure columns of a role index to correlate (see ``column_roles.measure_columns``)."""
+    return measure_columns(index, columns)[:CORRELATION_MAX_COLUMNS]
+
+
+def _column_chunk(values: pd.Series, rows, out: np.ndarray) -> np.ndarray:
+    """
+    Rows (a slice or positions) of a numeric column as float64 with NaN for nulls. Float64
+    columns are sliced as views or gathered into ``out``, so no chunk-sized array is allocated.
+    """
+    if values.dtype == np.float64:
+        data = values.to_numpy()
+        return data[rows] if isinstance(rows, slice) else np.take(data, rows, out=out[:len(rows)])
+    return values.iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class CorrelationMatrix:
+    """
+    Pearson correlations of ``columns``. Each chunk is shifted and scaled by the means and
+    standard deviations of the first one, so the values are standardized and float32 is
+    precise enough; its Gram matrix is then added with a single BLAS product. Nulls count
+    as the first chunk's mean. Updating is exact, so the matrix can be kept at ingest and
+    updated on append.
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.rows = 0
+        self.shift: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+        self.sums = np.zeros(len(columns))
+        self.gram = np.zeros((len(columns), len(columns)))
+
+    @classmethod
+    def for_frame(cls, df: pd.DataFrame, columns: Optional[List[str]] = None,
+                  sample_rows: int = CORRELATION_SAMPLE_ROWS) -> "CorrelationMatrix":
+        """Correlations of an in-memory frame (of its numeric columns by default), optionally on a sample."""
+        if columns is None:
+            columns = list(df.iloc[:0].select_dtypes(include=[np.number]).columns)
+        positions = None
+        if sample_rows and len(df) > sample_rows:
+            # Random runs of consecutive rows: gathering them reads only the sampled part of each column
+            runs = np.sort(np.random.default_rng(0).choice(-(-len(df) // SAMPLE_RUN_ROWS),
+                                                           -(-sample_rows // SAMPLE_RUN_ROWS), replace=False))
+            positions = (runs[:, None] * SAMPLE_RUN_ROWS + np.arange(SAMPLE_RUN_ROWS)).ravel()
+            positions = positions[positions < len(df)]
+        matrix = cls(columns)
+        matrix.update(df, positions)
+        return matrix
+
+    def _add(self, values: Iterator[np.ndarray], z: np.ndarray) -> None:
+        """
+        Add one chunk, given as a float64 array (NaN for nulls) per column. ``z`` is a
+        float32 block with a row per chunk row and one column more than ``columns``.
+        """
+        k = len(self.columns)
+        first = self.shift is None
+        if first:
+            self.shift, self.scale = np.zeros(k), np.ones(k)
+        shifted = np.empty(len(z))
+        for j, v in enumerate(values):
+            if first:
+                present = v[~np.isnan(v)]
+                if len(present):
+                    sd = present.std()
+                    self.shift[j], self.scale[j] = present.mean(), sd if sd > 0 else 1.0
+            # Shifted in float64 (raw values can be large), scaled while written to float32
+            np.subtract(v, self.shift[j], out=shifted)
+            np.multiply(shifted, 1.0 / self.scale[j], out=z[:, j], casting='unsafe')
+        # A last column of ones makes the same product return the column sums
+        z[:, k] = 1.0
+        gram = z.T @ z
+        # Nulls show up as NaN in their column's row of the product; those columns are zeroed
+        # (imputed with the shift) and their rows multiplied again
+        nulls = np.flatnonzero(np.isnan(np.diag(gram)))
+        if len(nulls):
+            block = z[:, nulls]
+            block[np.isnan(block)] = 0.0
+            z[:, nulls] = block
+            gram[nulls, :] = block.T @ z
+            gram[:, nulls] = gram[nulls, :].T
+        self.sums += gram[k, :k]
+        self.gram += gram[:k, :k]
+        self.rows += len(z)
+
+    def update(self, df: pd.DataFrame, positions: Optional[np.ndarray] = None) -> None:
+        """Add the rows of ``df`` (only those at ``positions``, if given) one chunk at a time."""
+        rows = len(df) if positions is None else len(positions)
+        if not self.columns or not rows:
+            self.rows += rows
+            return
+        series = [df[c] for c in self.columns]
+        # Buffers are reused across chunks: fresh chunk-sized arrays would be page-faulted in every time
+        size = min(rows, CORRELATION_CHUNK_ROWS)
+        block = np.empty((size, len(self.columns) + 1), dtype=np.float32, order='F')
+        gathered = np.empty(size)
+        for start in range(0, rows, CORRELATION_CHUNK_ROWS):
+            stop = min(start + CORRELATION_CHUNK_ROWS, rows)
+            chunk = slice(start, stop) if positions is None else positions[start:stop]
+            z = block if stop - start == size else np.asfortranarray(block[:stop - start])
+            self._add((_column_chunk(s, chunk, gathered) for s in series), z)
+
+    def matrix(self) -> np.ndarray:
+        """The correlation matrix; NaN for constant (or empty) columns."""
+        if self.rows < 2:
+            return np.full(self.gram.shape, np.nan)
+        mean = self.sums / self.rows
+        cov = self.gram / self.rows - np.outer(mean, mean)
+        sd = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(sd, sd)
+        corr[(sd <= 1e-6)[:, None] | (sd <= 1e-6)[None, :]] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    def top_pairs(self, k: int = 5, min_abs: float = STRONG_CORRELATION,
+                  columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """The ``k`` most strongly correlated column pairs (among ``columns``, if given), strongest first."""
+        keep = np.array([columns is None or c in columns for c in self.columns], dtype=bool)
+        corr = self.matrix()
+        i, j = np.triu_indices(len(self.columns), k=1)
+        pick = keep[i] & keep[j] & ~np.isnan(corr[i, j]) & (np.abs(corr[i, j]) >= min_abs)
+        i, j = i[pick], j[pick]
+        order = np.argsort(-np.abs(corr[i, j]), kind="stable")[:k]
+        return [{"x": self.columns[i[o]], "y": self.columns[j[o]], "correlation": float(corr[i[o], j[o]])}
+                for o in order]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"columns": self.columns, "rows": self.rows, "sums": self.sums.tolist(), "gram": self.gram.tolist(),
+                "shift": None if self.shift is None else self.shift.tolist(),
+                "scale": None if self.scale is None else self.scale.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CorrelationMatrix":
+        matrix = cls(data["columns"])
+        matrix.rows = data["rows"]
+        matrix.sums = np.asarray(data["sums"], dtype=np.float64)
+        matrix.gram = np.asarray(data["gram"], dtype=np.float64).reshape(len(matrix.columns), len(matrix.columns))
+        if data["shift"] is not None:
+            matrix.shift = np.asarray(data["shift"], dtype=np.float64)
+            matrix.scale = np.asarray(data["scale"], dtype=np.float64)
+        return matrix
@@ -3,75 +3,315 @@
 Automatic data analysis and business insights generation.
 Inspired by the enhanced Streamlit app's intelligence features.
 """
+import os
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from app.chunked_analysis import chunked_outliers
+from app.column_roles import dataset_roles, insight_roles, measure_columns
+from app.correlations import CorrelationMatrix, correlation_columns
+from app.dataset_profile import profile_statistics
+from app.frame_statistics import STAT_QUANTILES, frame_outliers, frame_statistics, quantile_label
+from app.insight_aggregates import InsightAggregates
+from app.partitioned import frame_aggregates
+from app.sketches import DatasetSketches
+from app.time_rollups import ANOMALY_WINDOW, TimeRollups
+
+# Bump whenever the output of ``analyze()`` changes; cached analyses from other versions are recomputed
+ANALYZER_VERSION = 10
+# Threads running the business analyzers at once, shared by every analysis in the process; 1 runs them one after another
+INSIGHT_WORKERS = int(os.getenv("INSIGHT_WORKERS", 5))
+# Seconds an analyzer may run before its insight is dropped from the response (0 waits for every analyzer)
+ANALYZER_TIMEOUT_SECONDS = float(os.getenv("ANALYZER_TIMEOUT_SECONDS", 30))
+
+
+
+class AnalyzerCancelled(Exception):
+    """Raised in a dropped analyzer at its next checkpoint, so its thread goes back to the pool."""
+
+
+_analyzer_pool = None
+_analyzer_pool_lock = threading.Lock()
+
+def get_analyzer_pool() -> ThreadPoolExecutor:
+    """Process-wide pool of ``INSIGHT_WORKERS`` threads the analyzers of every engine run on."""
+    global _analyzer_pool
+    with _analyzer_pool_lock:
+        if _analyzer_pool is None:
+            _analyzer_pool = ThreadPoolExecutor(max_workers=max(INSIGHT_WORKERS, 1), thread_name_prefix="analyzer")
+    return _analyzer_pool
 
 
 class DataInsightsEngine:
-    """Generate business insights and recommendations from data automatically."""
+    """
+    Generate business insights and recommendations from data automatically.
+    The insights are read from ``InsightAggregates``: pass the ones kept up to date at
+    ingest and on append (``df`` then only needs the schema), or they are computed
+    from ``df`` in row partitions on a thread pool.
+    
+    Passing ``sketches`` turns on the approximate mode: distinct counts, top groups and
+    quantiles come from the dataset's sketches, and ``analyze()`` adds their ``error_bounds``.
+    
+    The trend insight reads day/week/month ``rollups`` over the date column (kept at
+    ingest like the aggregates); without them they are rolled up from ``df``.
+    The correlation insight and scatter suggestions read the numeric ``correlations``
+    (also kept at ingest, else computed the same way). Outliers are flagged in the rows
+    of ``df``, or in the Parquet ``paths`` of the dataset (fences from the profile's
+    quartiles) when ``df`` only carries the schema.
     
-    def __init__(self, df: pd.DataFrame):
+    When ``df`` is a uniform sample of a dataset of ``population`` rows, the aggregates
+    computed from it are scaled up to the dataset (a fast, approximate first answer).
+    
+    Column roles come from the role index persisted in ``profile`` (or the dtypes of ``df``).
+    The analyzers run on the shared analyzer pool (in sequence when ``workers`` is 1); one
+    that runs, or waits for a thread, longer than ``timeout`` seconds is dropped and stops
+    at its next checkpoint. ``timings`` records how long each analyzer took.
+    An engine analyzes once: every aggregation it reads is memoized, so insights,
+    recommendations, auto charts and statistics share them.
+    """
+    
+    def __init__(self, df: pd.DataFrame, profile: Optional[Dict[str, Any]] = None,
+                 aggregates: Optional[InsightAggregates] = None, sketches: Optional[DatasetSketches] = None,
+                 rollups: Optional[TimeRollups] = None, correlations: Optional[CorrelationMatrix] = None,
+                 paths: Optional[List[Path]] = None, population: Optional[int] = None, workers: int = INSIGHT_WORKERS, timeout: float = ANALYZER_TIMEOUT_SECONDS):
         self.df = df
-        self.insights = []
-        self.recommendations = []
+        self.profile = profile
+        self.aggregates = aggregates
+        self.sketches = sketches
+        self.rollups = rollups
+        self.correlations = correlations
+        self.paths = paths
+        self.population = population
+        self.error_bounds: Dict[str, Dict[str, Any]] = {}
+        self.insights: Optional[List[Dict[str, Any]]] = None
+        self.recommendations: Optional[List[str]] = None
+        self.statistics: Optional[Dict[str, Any]] = None
+        self.workers = workers
+        self.timeout = timeout
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        # Column roles and shared aggregations (the analysis plan); analyzers on
+        # different threads wait for an aggregation another one is computing
+        self._role_index: Optional[Dict[str, Any]] = None
+        self._results: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # Set in the pool thread of an analyzer once it is dropped
+        self._local = threading.local()
         
     def analyze(self) -> Dict[str, Any]:
         """Run complete analysis and return all insights."""
-        return {
+        analysis = {
             'insights': self.generate_insights(),
             'recommendations': self.generate_recommendations(),
             'auto_charts': self.suggest_auto_charts(),
-            'statistics': self.calculate_statistics()
+            'statistics': self._timed('statistics', self.calculate_statistics),
+            'timings': dict(self.timings)
         }
+        if self.sketches is not None or self.error_bounds:
+            analysis['error_bounds'] = self.error_bounds
+        return analysis
     
     def generate_insights(self) -> List[Dict[str, Any]]:
-        """Generate 5 key business insights automatically."""
-        insights = []
-        
-        # 1. Revenue Performance
-        revenue_insight = self._analyze_revenue()
-        if revenue_insight:
-            insights.append(revenue_insight)
-        
-        # 2. Top Performing Categories
-        category_insight = self._analyze_categories()
-        if category_insight:
-            insights.append(category_insight)
-        
-        # 3. Return/Quality Analysis
-        quality_insight = self._analyze_quality()
-        if quality_insight:
-            insights.append(quality_insight)
-        
-        # 4. Geographic Performance
-        geo_insight = self._analyze_geography()
-        if geo_insight:
-            insights.append(geo_insight)
+        """Generate 8 key business insights automatically."""
+        if self.insights is not None:
+            return self.insights
+        analyzers = [
+            ('revenue', self._analyze_revenue),        # 1. Revenue Performance
+            ('categories', self._analyze_categories),  # 2. Top Performing Categories
+            ('quality', self._analyze_quality),        # 3. Return/Quality Analysis
+            ('geography', self._analyze_geography),    # 4. Geographic Performance
+            ('customers', self._analyze_customers),    # 5. Customer Engagement
+            ('trend', self._analyze_trend),            # 6. Period-over-Period Trend
+            ('correlations', self._analyze_correlations),  # 7. Strongest Correlations
+            ('outliers', self._analyze_outliers)       # 8. Outliers & Anomalies
+        ]
+        results = self._run_analyzers(analyzers)
+        self.insights = [results[name] for name, _ in analyzers if results.get(name)]
+        return self.insights
+    
+    def _timed(self, name: str, analyzer: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = analyzer()
+        self._checkpoint()
+        self.timings.setdefault(name, {'seconds': round(time.perf_counter() - start, 6),
+                                       'status': 'ok' if result else 'skipped'})
+        return result
+    
+    def _checkpoint(self) -> None:
+        """Stop the calling analyzer if it was dropped; checked between the aggregations it reads."""
+        cancelled = getattr(self._local, 'cancelled', None)
+        if cancelled is not None and cancelled.is_set():
+            raise AnalyzerCancelled()
+    
+    def _run_analyzers(self, analyzers: List[Tuple[str, Callable[[], Any]]]) -> Dict[str, Any]:
+        """
+        Run the analyzers on the shared analyzer pool unless ``workers`` is 1, and return
+        their results by name. Each gets ``timeout`` seconds from when it starts (or, while
+        the pool is busy, from when it was submitted); one still running then is dropped:
+        its result and timings are discarded and it stops at its next checkpoint.
+        """
+        if self.workers <= 1 or len(analyzers) <= 1:
+            return {name: self._timed(name, analyzer) for name, analyzer in analyzers}
+        submitted = time.perf_counter()
+        started: Dict[str, float] = {}
         
-        # 5. Customer Engagement
-        customer_insight = self._analyze_customers()
-        if customer_insight:
-            insights.append(customer_insight)
+        def run(name: str, analyzer: Callable[[], Any], cancelled: threading.Event) -> Any:
+            started[name] = time.perf_counter()
+            self._local.cancelled = cancelled
+            try:
+                self._checkpoint()
+                return self._timed(name, analyzer)
+            finally:
+                self._local.cancelled = None
         
-        return insights
-    
-    def _detect_column(self, keywords: List[str]) -> Optional[str]:
-        """Find column matching any of the keywords (case-insensitive)."""
-        columns_lower = {col.lower(): col for col in self.df.columns}
-        for keyword in keywords:
-            for col_lower, col_original in columns_lower.items():
-                if keyword.lower() in col_lower:
-                    return col_original
-        return None
+        pool = get_analyzer_pool()
+        running: Dict[Future, Tuple[str, threading.Event]] = {}
+        for name, analyzer in analyzers:
+            cancelled = threading.Event()
+            running[pool.submit(run, name, analyzer, cancelled)] = (name, cancelled)
+        results = {}
+        while running:
+            timeout = None
+            if self.timeout:
+                deadline = min(started.get(name, submitted) for name, _ in running.values()) + self.timeout
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)[0]] = future.result()
+            now = time.perf_counter()
+            for future, (name, cancelled) in list(running.items()):
+                begun = started.get(name, submitted)
+                if self.timeout and now - begun >= self.timeout:
+                    del running[future]
+                    cancelled.set()
+                    future.cancel()
+                    self.timings[name] = {'seconds': round(now - begun, 6), 'status': 'timeout'}
+                    print(f"Analyzer {name} still running after {self.timeout}s, dropping its insight")
+        return results
+    
+    def _roles(self) -> Dict[str, Any]:
+        """Semantic role index of the dataset (see ``column_roles.role_index``)."""
+        if self._role_index is None:
+            self._role_index = dataset_roles(self.df, self.profile)
+        return self._role_index
+    
+    def _insight_columns(self) -> Dict[str, Optional[str]]:
+        return insight_roles(self._roles())
+    
+    def _column(self, role: str) -> Optional[str]:
+        """Column playing a semantic role, or None."""
+        return self._roles()[role]
+    
+    def _shared(self, kind: str, col: str, compute: Callable[[], Any], wait: bool = True) -> Any:
+        """
+        Result of one aggregation, computed the first time any analyzer asks for it. Each
+        aggregation has its own lock (``self._lock`` only guards creating them). Without
+        ``wait``, None is returned instead of waiting for another thread computing it,
+        which after ``_run_analyzers`` can only be an analyzer that timed out. A dropped
+        analyzer stops while waiting and never stores what it computed.
+        """
+        key = (kind, col)
+        if key not in self._results:
+            self._checkpoint()
+            with self._lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+            if not wait and not lock.acquire(blocking=False):
+                return None
+            while wait and not lock.acquire(timeout=0.05):
+                self._checkpoint()
+            try:
+                if key not in self._results:
+                    result = compute()
+                    self._checkpoint()
+                    self._results[key] = result
+            finally:
+                lock.release()
+        return self._results[key]
+    
+    def _aggregates(self) -> InsightAggregates:
+        if self.aggregates is None:
+            def compute() -> InsightAggregates:
+                aggregates = frame_aggregates(self.df, self._insight_columns())
+                return aggregates if self.population is None else aggregates.scaled(self.population)
+            self.aggregates = self._shared('aggregates', '', compute)
+        return self.aggregates
+    
+    def _rollups(self) -> Optional[TimeRollups]:
+        if self.rollups is None:
+            def compute() -> Optional[TimeRollups]:
+                profiled = self.profile["columns"] if self.profile is not None else None
+                rollups = TimeRollups.for_roles(self._roles(), profiled)
+                if rollups is not None:
+                    rollups.update(self.df)
+                return rollups
+            self.rollups = self._shared('rollups', '', compute)
+        return self.rollups
+    
+    def _strong_pairs(self, wait: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        The most strongly correlated numeric column pairs, from the kept matrix or computed
+        once. Without ``wait``, None while another thread is still computing them.
+        """
+        def compute() -> List[Dict[str, Any]]:
+            correlations = self.correlations
+            if correlations is None:
+                correlations = CorrelationMatrix.for_frame(self.df, correlation_columns(self._roles()))
+            return correlations.top_pairs()
+        return self._shared('correlations', 'pairs', compute, wait)
+    
+    def _num_rows(self) -> int:
+        return self._aggregates().rows
+    
+    def _approximate(self, col: str, kind: str) -> bool:
+        return self.sketches is not None and col in getattr(self.sketches, kind)
+    
+    def _group_sums(self, group_col: str) -> pd.Series:
+        """Sales summed per group, heaviest first."""
+        def compute() -> pd.Series:
+            if self._approximate(group_col, 'top'):
+                sums = self.sketches.top[group_col].counts
+            else:
+                sums = self._aggregates().group_sums(group_col)
+            return sums.sort_values(ascending=False)
+        return self._shared('group_sums', group_col, compute)
+    
+    def _group_count(self, group_col: str, sums: pd.Series) -> int:
+        """Number of groups; with sketches only the heaviest groups are tracked, so it is estimated."""
+        return self._nunique(group_col) if self._approximate(group_col, 'distinct') else int(sums.count())
+    
+    def _value_counts(self, col: str) -> pd.Series:
+        return self._shared('value_counts', col, lambda: self._aggregates().value_counts(col))
+    
+    def _nunique(self, col: str) -> int:
+        def compute() -> int:
+            if self._approximate(col, 'distinct'):
+                return int(round(self.sketches.distinct[col].estimate()))
+            return self._aggregates().nunique(col)
+        return self._shared('nunique', col, compute)
+    
+    def _distinct_bounds(self, col: str) -> Dict[str, Any]:
+        sketch = self.sketches.distinct[col]
+        estimate, error = sketch.estimate(), sketch.relative_error
+        return {'method': 'hyperloglog', 'relative_std_error': error,
+                'interval_95': [int(estimate * (1 - 2 * error)), int(np.ceil(estimate * (1 + 2 * error)))]}
+    
+    def _top_group_bounds(self, group_col: str, top: pd.Series) -> Dict[str, Any]:
+        """Error bounds of a top-groups insight computed from sketches."""
+        sketch = self.sketches.top[group_col]
+        bounds = {'method': 'space_saving',
+                  'max_overestimate': float(sketch.errors[top.index[0]]) if len(top) else 0.0}
+        if self._approximate(group_col, 'distinct'):
+            bounds['group_count'] = self._distinct_bounds(group_col)
+        return bounds
     
     def _analyze_revenue(self) -> Optional[Dict[str, Any]]:
         """Analyze revenue performance."""
-        revenue_col = self._detect_column(['revenue', 'sales', 'amount', 'price', 'total'])
-        
-        if revenue_col and pd.api.types.is_numeric_dtype(self.df[revenue_col]):
-            total_revenue = self.df[revenue_col].sum()
-            avg_revenue = self.df[revenue_col].mean()
+        if self._column('revenue'):
+            total_revenue, avg_revenue = self._aggregates().revenue_sum, self._aggregates().revenue_mean
             
             return {
                 'category': 'revenue',
@@ -80,7 +320,7 @@ class DataInsightsEngine:
                 'metrics': {
                     'total_revenue': f"${float(total_revenue):,.2f}",
                     'avg_transaction': f"${float(avg_revenue):,.2f}",
-                    'num_transactions': int(len(self.df))
+                    'num_transactions': int(self._num_rows())
                 },
                 'summary': f"Total revenue: ${float(total_revenue):,.2f} | Avg per transaction: ${float(avg_revenue):,.2f}",
                 'recommendation': "Focus on increasing average transaction value through upselling and cross-selling strategies."
@@ -89,13 +329,14 @@ class DataInsightsEngine:
     
     def _analyze_categories(self) -> Optional[Dict[str, Any]]:
         """Analyze top performing categories/products."""
-        category_col = self._detect_column(['category', 'product', 'type', 'segment'])
-        revenue_col = self._detect_column(['revenue', 'sales', 'amount', 'price'])
+        category_col = self._column('category')
         
-        if category_col and revenue_col:
-            # Group by category and sum revenue
-            cat_revenue = self.df.groupby(category_col)[revenue_col].sum().sort_values(ascending=False)
+        if category_col and self._column('sales'):
+            # Revenue summed by category (shared with geography when it is the same column)
+            cat_revenue = self._group_sums(category_col)
             top_3 = cat_revenue.head(3)
+            if self._approximate(category_col, 'top'):
+                self.error_bounds['categories'] = self._top_group_bounds(category_col, top_3)
             
             return {
                 'category': 'categories',
@@ -104,7 +345,7 @@ class DataInsightsEngine:
                 'metrics': {
                     'top_category': str(top_3.index[0]) if len(top_3) > 0 else 'N/A',
                     'top_revenue': f"${top_3.iloc[0]:,.2f}" if len(top_3) > 0 else '$0',
-                    'num_categories': int(cat_revenue.count())
+                    'num_categories': self._group_count(category_col, cat_revenue)
                 },
                 'summary': f"Best: {top_3.index[0]} (${top_3.iloc[0]:,.2f})" if len(top_3) > 0 else "No data",
                 'recommendation': f"Increase inventory and marketing budget for top category: {top_3.index[0]}"
@@ -113,11 +354,11 @@ class DataInsightsEngine:
     
     def _analyze_quality(self) -> Optional[Dict[str, Any]]:
         """Analyze returns or quality issues."""
-        status_col = self._detect_column(['status', 'state', 'order_status'])
+        status_col = self._column('status')
         
         if status_col:
-            status_counts = self.df[status_col].value_counts()
-            total = len(self.df)
+            status_counts = self._value_counts(status_col)
+            total = self._num_rows()
             
             # Look for return/cancelled indicators
             return_keywords = ['return', 'cancel', 'refund', 'failed']
@@ -144,12 +385,13 @@ class DataInsightsEngine:
     
     def _analyze_geography(self) -> Optional[Dict[str, Any]]:
         """Analyze geographic performance."""
-        geo_col = self._detect_column(['location', 'city', 'region', 'zone', 'state', 'country'])
-        revenue_col = self._detect_column(['revenue', 'sales', 'amount', 'price'])
+        geo_col = self._column('geography')
         
-        if geo_col and revenue_col:
-            geo_revenue = self.df.groupby(geo_col)[revenue_col].sum().sort_values(ascending=False)
+        if geo_col and self._column('sales'):
+            geo_revenue = self._group_sums(geo_col)
             top_region = geo_revenue.head(1)
+            if self._approximate(geo_col, 'top'):
+                self.error_bounds['geography'] = self._top_group_bounds(geo_col, top_region)
             
             return {
                 'category': 'geography',
@@ -158,7 +400,7 @@ class DataInsightsEngine:
                 'metrics': {
                     'top_market': str(top_region.index[0]),
                     'top_revenue': f"${float(top_region.iloc[0]):,.2f}",
-                    'num_regions': int(geo_revenue.count())
+                    'num_regions': self._group_count(geo_col, geo_revenue)
                 },
                 'summary': f"Top market: {top_region.index[0]} (${float(top_region.iloc[0]):,.2f})",
                 'recommendation': f"Replicate successful strategies from {top_region.index[0]} to underperforming regions."
@@ -167,11 +409,13 @@ class DataInsightsEngine:
     
     def _analyze_customers(self) -> Optional[Dict[str, Any]]:
         """Analyze customer engagement."""
-        customer_col = self._detect_column(['customer', 'customer_id', 'user_id', 'client'])
+        customer_col = self._column('customer')
         
         if customer_col:
-            unique_customers = self.df[customer_col].nunique()
-            total_orders = len(self.df)
+            unique_customers = self._nunique(customer_col)
+            total_orders = self._num_rows()
+            if self._approximate(customer_col, 'distinct'):
+                self.error_bounds['customers'] = self._distinct_bounds(customer_col)
             avg_orders = total_orders / unique_customers if unique_customers > 0 else 0
             
             return {
@@ -188,16 +432,156 @@ class DataInsightsEngine:
             }
         return None
     
+    def _analyze_trend(self) -> Optional[Dict[str, Any]]:
+        """Compare the latest period with the one before it, read from the time rollups."""
+        rollups = self._rollups()
+        if rollups is None:
+            return None
+        sales_col = self._column('sales')
+        measure = sales_col if sales_col in rollups.numeric else None
+        # Coarsest grain with two complete periods to compare (the data may stop mid-period)
+        series, grain = None, None
+        for grain in ('month', 'week', 'day'):
+            series = rollups.series(measure, grain).fillna(0)
+            if len(series) and not rollups.complete(grain):
+                series = series.iloc[:-1]
+            if len(series) >= 2:
+                break
+        if series is None or len(series) < 2:
+            return None
+        latest, previous = float(series.iloc[-1]), float(series.iloc[-2])
+        change = (latest - previous) / previous * 100 if previous else None
+        label = series.index[-1].strftime('%b %Y' if grain == 'month' else '%Y-%m-%d')
+        
+        def fmt(value: float) -> str:
+            return f"${value:,.2f}" if measure else f"{int(value):,}"
+        
+        what = 'Revenue' if measure else 'Orders'
+        trend = 'up' if latest > previous else 'down' if latest < previous else 'flat'
+        change_text = f"{change:+.1f}%" if change is not None else 'N/A'
+        moved = f"{trend} {abs(change):.1f}%" if change is not None else trend
+        return {
+            'category': 'trend',
+            'icon': '📉' if trend == 'down' else '📈',
+            'title': 'Period-over-Period Trend',
+            'metrics': {
+                'period': grain,
+                'latest_period': label,
+                'latest': fmt(latest),
+                'previous': fmt(previous),
+                'change': change_text
+            },
+            'summary': f"{what} {moved} in the {grain} of {label} vs the previous {grain} ({fmt(latest)} vs {fmt(previous)})",
+            'recommendation': f"Investigate what drove the {grain}-over-{grain} decline and act on the affected products and regions." if trend == 'down' else f"Build on the {grain}-over-{grain} momentum: keep the campaigns and stock levels behind it."
+        }
+    
+    def _analyze_correlations(self) -> Optional[Dict[str, Any]]:
+        """Surface the numeric columns that move together (or in opposite directions)."""
+        pairs = self._strong_pairs()
+        if not pairs:
+            return None
+        x, y, r = pairs[0]['x'], pairs[0]['y'], pairs[0]['correlation']
+        direction = 'move together' if r > 0 else 'move in opposite directions'
+        return {
+            'category': 'correlations',
+            'icon': '🔗',
+            'title': 'Strongest Correlations',
+            'metrics': {
+                'top_pair': f"{x} & {y}",
+                'correlation': f"{r:+.2f}",
+                'strong_pairs': len(pairs)
+            },
+            'pairs': pairs,
+            'summary': f"{x} and {y} {direction} (r = {r:+.2f})",
+            'recommendation': f"Track {x} alongside {y}: changes in one signal changes in the other. Correlation is not causation, so test before acting on it."
+        }
+    
+    def _outliers(self) -> Tuple[Dict[str, Dict[str, Any]], int, bool]:
+        """
+        Outliers per measure column, the number of rows searched and whether those were a
+        sample. Flagged rows are reported by index: positions in the dataset, which the
+        persisted sample keeps for its rows.
+        """
+        profiled = self.profile["columns"] if self.profile is not None else None
+        if not len(self.df) and self.paths and profiled is not None:
+            # Every stored row, scanned in batches against the profile's quartiles
+            quartiles = {c: (profiled[c]['quantiles']['p25'], profiled[c]['quantiles']['p75'])
+                         for c in measure_columns(self._roles(), profiled)
+                         if profiled[c]['quantiles']['p25'] is not None}
+            return (chunked_outliers(self.paths, quartiles, checkpoint=self._checkpoint),
+                    self.profile["num_rows"], False)
+        rows = self.df
+        if not len(rows):
+            return {}, 0, False
+        columns = [c for c in measure_columns(self._roles(), profiled) if c in rows.columns]
+        quartiles = None
+        if self.profile is None:
+            # The batched statistics of an in-memory frame already sorted every column
+            stats = self.calculate_statistics()['numeric_stats']
+            if all(c in stats for c in columns):
+                quartiles = {c: (stats[c]['quantiles']['p25'], stats[c]['quantiles']['p75']) for c in columns}
+        outliers = frame_outliers(rows, columns, quartiles)
+        for found in outliers.values():
+            found['rows'] = rows.index[found['rows']].tolist()
+        return outliers, len(rows), self.population is not None
+    
+    def _analyze_outliers(self) -> Optional[Dict[str, Any]]:
+        """Flag outlying values per measure column (IQR fences) and anomalous periods (rolling z-scores)."""
+        outliers, searched, sampled = self._outliers()
+        anomalies, grain, measure = [], None, None
+        rollups = self._rollups()
+        if rollups is not None:
+            sales_col = self._column('sales')
+            measure = sales_col if sales_col in rollups.numeric else None
+            # Daily when there is enough history to score against, else weekly
+            grain = next((g for g in ('day', 'week') if len(rollups.grains[g]) > 2 * ANOMALY_WINDOW), None)
+            if grain is not None:
+                anomalies = rollups.anomalies(measure, grain)
+        if not outliers and not anomalies:
+            return None
+        
+        parts = []
+        metrics: Dict[str, Any] = {'columns_with_outliers': len(outliers)}
+        if outliers:
+            top = max(outliers, key=lambda c: outliers[c]['count'])
+            found = outliers[top]
+            basis = f"sampled rows (of {searched:,})" if sampled else 'rows'
+            metrics.update({
+                'top_column': top,
+                'top_column_outliers': found['count'],
+                'outlier_rate': f"{found['count'] / searched * 100:.2f}%"
+            })
+            parts.append(f"{found['count']:,} {basis} with {top} outside {found['low']:,.2f} to {found['high']:,.2f}")
+        if anomalies:
+            metrics['anomalous_periods'] = len(anomalies)
+            worst = anomalies[0]
+            parts.append(f"{len(anomalies)} anomalous {grain}s in {measure or 'order count'} "
+                         f"(largest: {worst['period']}, z = {worst['zscore']:+.1f})")
+        return {
+            'category': 'outliers',
+            'icon': '🚨',
+            'title': 'Outliers & Anomalies',
+            'metrics': metrics,
+            'outliers': outliers,
+            'anomalies': anomalies,
+            'sampled': sampled,
+            'summary': ' | '.join(parts),
+            'recommendation': "Review the flagged rows and periods for data-entry errors, one-off orders or incidents before relying on averages."
+        }
+    
     def generate_recommendations(self) -> List[str]:
         """Generate actionable business recommendations."""
+        if self.recommendations is not None:
+            return self.recommendations
         recs = []
         
-        # Extract recommendations from insights
+        # Extract recommendations from the (already generated) insights
         insights = self.generate_insights()
         for insight in insights:
             if insight.get('recommendation'):
                 recs.append(insight['recommendation'])
         
+        self.recommendations = recs
         return recs
     
     def suggest_auto_charts(self) -> List[Dict[str, str]]:
@@ -205,8 +589,8 @@ class DataInsightsEngine:
         suggestions = []
         
         # 1. Revenue by Category
-        category_col = self._detect_column(['category', 'product', 'type'])
-        revenue_col = self._detect_column(['revenue', 'sales', 'amount'])
+        category_col = self._column('category')
+        revenue_col = self._column('sales')
         if category_col and revenue_col:
             suggestions.append({
                 'title': 'Revenue by Category',
@@ -215,7 +599,7 @@ class DataInsightsEngine:
             })
         
         # 2. Revenue Trend Over Time
-        date_col = self._detect_column(['date', 'time', 'created', 'order_date'])
+        date_col = self._column('date')
         if date_col and revenue_col:
             suggestions.append({
                 'title': 'Revenue Trend Over Time',
@@ -224,7 +608,7 @@ class DataInsightsEngine:
             })
         
         # 3. Status Distribution
-        status_col = self._detect_column(['status', 'state'])
+        status_col = self._column('status')
         if status_col:
             suggestions.append({
                 'title': 'Order Status Distribution',
@@ -233,7 +617,7 @@ class DataInsightsEngine:
             })
         
         # 4. Geographic Performance
-        geo_col = self._detect_column(['location', 'city', 'region'])
+        geo_col = self._column('geography')
         if geo_col and revenue_col:
             suggestions.append({
                 'title': 'Geographic Performance',
@@ -241,9 +625,17 @@ class DataInsightsEngine:
                 'prompt': f'{revenue_col} by {geo_col}'
             })
         
-        # 5. Price Analysis
-        price_cols = [col for col in self.df.columns if 'price' in col.lower()]
-        if len(price_cols) >= 2:
+        # 5. Strongest correlations, else Price Analysis; pairs a timed-out analyzer is
+        # still computing are not waited for
+        pairs = self._strong_pairs(wait=self.insights is None) or []
+        for pair in pairs[:2]:
+            suggestions.append({
+                'title': f"{pair['x']} vs {pair['y']}",
+                'type': 'scatter',
+                'prompt': f"relationship between {pair['x']} and {pair['y']}"
+            })
+        price_cols = self._column('price')
+        if not pairs and len(price_cols) >= 2:
             suggestions.append({
                 'title': 'Price Analysis',
                 'type': 'scatter',
@@ -254,33 +646,30 @@ class DataInsightsEngine:
     
     def calculate_statistics(self) -> Dict[str, Any]:
         """Calculate enhanced statistics for the dataset."""
-        stats = {
-            'shape': {
-                'rows': int(len(self.df)),
-                'columns': int(len(self.df.columns))
-            },
-            'columns': {
-                'numeric': int(len(self.df.select_dtypes(include=[np.number]).columns)),
-                'categorical': int(len(self.df.select_dtypes(include=['object', 'category']).columns)),
-                'datetime': int(len(self.df.select_dtypes(include=['datetime']).columns))
-            },
-            'missing': {
-                'total_missing': int(self.df.isnull().sum().sum()),
-                'missing_percentage': float(self.df.isnull().sum().sum() / (len(self.df) * len(self.df.columns)) * 100)
-            }
-        }
-        
-        # Add column-level statistics for numeric columns
-        numeric_stats = {}
-        for col in self.df.select_dtypes(include=[np.number]).columns:
-            numeric_stats[col] = {
-                'mean': float(self.df[col].mean()),
-                'median': float(self.df[col].median()),
-                'std': float(self.df[col].std()),
-                'min': float(self.df[col].min()),
-                'max': float(self.df[col].max())
-            }
-        
-        stats['numeric_stats'] = numeric_stats
-        
+        if self.statistics is not None:
+            return self.statistics
+        stats = self.statistics = self._exact_statistics()
+        if self.sketches is not None:
+            # Medians and quantiles from the t-digests, with the rank error of each
+            bounds = {}
+            for col, digest in self.sketches.quantiles.items():
+                if col not in stats['numeric_stats'] or not digest.count:
+                    continue
+                column = stats['numeric_stats'][col]
+                column['median'] = digest.quantile(0.5)
+                column['quantiles'] = {quantile_label(q): digest.quantile(q) for q in STAT_QUANTILES}
+                bounds[col] = {'median': digest.rank_error(0.5),
+                               **{quantile_label(q): digest.rank_error(q) for q in STAT_QUANTILES}}
+            self.error_bounds['statistics'] = {'method': 't-digest', 'rank_error': bounds}
+        elif self.profile is not None:
+            # Quantiles merged from t-digests on append are estimates even in the exact mode
+            bounds = {name: col['quantile_rank_error'] for name, col in self.profile['columns'].items()
+                      if col.get('quantile_rank_error')}
+            if bounds:
+                self.error_bounds['statistics'] = {'method': 't-digest', 'rank_error': bounds}
         return stats
+    
+    def _exact_statistics(self) -> Dict[str, Any]:
+        if self.profile is not None:
+            return profile_statistics(self.profile)
+        return frame_statistics(self.df)
@@ -1,11 +1,17 @@
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.ai_storyteller import get_storyteller
+from app.column_roles import describe_roles
 
 class DataQA:
-    def __init__(self, df: pd.DataFrame, file_id: str):
+    def __init__(self, df: pd.DataFrame, file_id: str, num_rows: Optional[int] = None,
+                 roles: Optional[Dict[str, Any]] = None):
         self.df = df
         self.file_id = file_id
+        # ``df`` may be just the schema; the row count then comes from the profile
+        self.num_rows = len(df) if num_rows is None else num_rows
+        # Persisted role index of the dataset, so the context names its key columns
+        self.roles = roles
         self.storyteller = get_storyteller()
     
     def ask(self, question: str, insights: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -18,7 +24,7 @@ class DataQA:
                 'success': True,
                 'context': {
                     'file_id': self.file_id,
-                    'rows': len(self.df),
+                    'rows': self.num_rows,
                     'columns': list(self.df.columns)
                 }
             }
@@ -29,7 +35,11 @@ class DataQA:
             }
     
     def _get_df_info(self) -> str:
-        return f"Dataset with {len(self.df)} rows and {len(self.df.columns)} columns. Columns: {', '.join(self.df.columns)}"
+        info = f"Dataset with {self.num_rows} rows and {len(self.df.columns)} columns. Columns: {', '.join(self.df.columns)}"
+        if self.roles:
+            info += f". Column roles: {', '.join(describe_roles(self.roles))}"
+        return info
 
-def create_qa_engine(df: pd.DataFrame, file_id: str) -> DataQA:
-    return DataQA(df, file_id)
+def create_qa_engine(df: pd.DataFrame, file_id: str, num_rows: Optional[int] = None,
+                     roles: Optional[Dict[str, Any]] = None) -> DataQA:
+    return DataQA(df, file_id, num_rows, roles)
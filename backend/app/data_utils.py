@@ -1,67 +1,482 @@
 # backend/app/data_utils.py
 # Ported from root data_utils.py
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import pandas as pd
-import numpy as np
-
-def infer_schema_from_df(df: pd.DataFrame) -> dict:
-    """Extract dataset features from a DataFrame for adaptive constraint generation."""
-    num_rows = len(df)
-    num_numeric = sum(pd.api.types.is_numeric_dtype(dt) for dt in df.dtypes)
-    num_categorical = sum(pd.api.types.is_object_dtype(dt) or pd.api.types.is_categorical_dtype(dt) for dt in df.dtypes)
-    has_date = False
-    date_col = None
-    time_gran = None
-    for col in df.columns:
-        try:
-            ser = pd.to_datetime(df[col], errors="coerce")
-            pct_non_null = ser.notnull().sum() / len(ser)
-            if pct_non_null > 0.6:
-                has_date = True
-                date_col = col
-                # estimate granularity
-                rng = ser.dropna()
-                if len(rng) > 1:
-                    if (rng.dt.day == 1).all():
-                        time_gran = "monthly"
-                    else:
-                        time_gran = "daily"
-                break
-        except Exception:
+import pyarrow.parquet as pq
+from app.dataset_profile import PROFILE_VERSION
+from app.data_insights import ANALYZER_VERSION, DataInsightsEngine
+from app.ingest import Sources, append_source, convert_source, write_json
+from app.insight_aggregates import InsightAggregates
+from app.sketches import DatasetSketches
+from app.time_rollups import TimeRollups
+from app.correlations import CorrelationMatrix
+from app.readers import SOURCE_FORMATS
+from app.catalog import Catalog
+from app.dataset_cache import get_dataset_cache
+from app.shared_cache import get_shared_cache
+
+# Data directory (raw uploads plus their columnar copies)
+DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).parent.parent / "data"))
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+# Uploads are stored once per distinct content (keyed by SHA-256); every upload gets a
+# file_id in the catalog pointing at that dataset, so re-uploads share all derived artifacts
+UPLOAD_DIR = DATA_DIR / "uploads"
+UPLOAD_DIR.mkdir(exist_ok=True)
+CATALOG_PATH = DATA_DIR / "catalog" / "catalog.db"
+# Last-access times of uploads are refreshed at most this often
+ACCESS_TOUCH_SECONDS = 60
+
+_catalog = None
+
+def get_catalog() -> Catalog:
+    """Process-wide dataset catalog; uploads stored before it existed are imported on creation."""
+    global _catalog
+    if _catalog is None:
+        created = not CATALOG_PATH.exists()
+        _catalog = Catalog(CATALOG_PATH)
+        if created:
+            _import_existing_uploads(_catalog)
+    return _catalog
+
+def _import_existing_uploads(catalog: Catalog) -> None:
+    """Register uploads kept as alias files or as plain ``{file_id}.csv`` before the catalog."""
+    alias_dir = DATA_DIR / "aliases"
+    for path in sorted(alias_dir.glob("*.json")):
+        with open(path) as f:
+            alias = json.load(f)
+        catalog.add_dataset(alias["dataset"], alias["created_at"], content_hash=alias["dataset"],
+                            version=int(dataset_path(alias["dataset"]).exists()))
+        catalog.add_file(path.stem, alias["dataset"], None, alias["created_at"])
+    for path in DATA_DIR.glob("*.csv"):
+        if path.suffixes != [".csv"]:
             continue
-    max_cardinality = max((df[col].nunique(dropna=True) for col in df.columns), default=0)
-    median_missing_pct = df.isnull().mean().median()
-    numeric_cols = df.select_dtypes(include=[np.number])
-    ratio = 1.0
-    if not numeric_cols.empty:
-        min_v = numeric_cols.min().min()
-        max_v = numeric_cols.max().max()
-        if min_v is None or pd.isna(min_v) or max_v is None or pd.isna(max_v):
-            ratio = 1.0
-        elif min_v == 0:
-            ratio = float("inf") if max_v != 0 else 1.0
-        else:
-            ratio = abs(max_v / (min_v if min_v != 0 else 1))
-    lat_lon_present = any(c.lower() in ("lat","latitude","lon","longitude") for c in df.columns)
-    country_code_present = any(c.lower() in ("country","country_code","iso3") for c in df.columns)
-
-    return {
-        "num_rows": num_rows,
-        "num_numeric": int(num_numeric),
-        "num_categorical": int(num_categorical),
-        "has_date": bool(has_date),
-        "date_col": date_col,
-        "time_granularity": time_gran,
-        "max_cardinality": int(max_cardinality),
-        "median_missing_pct": float(median_missing_pct),
-        "ratio_max_min": float(ratio if np.isfinite(ratio) else 1.0),
-        "lat_lon_present": lat_lon_present,
-        "country_code_present": country_code_present
-    }
-
-def load_csv(path: str, nrows: int = None):
-    """Safely load a CSV file."""
+        created_at = path.stat().st_mtime
+        catalog.add_dataset(path.stem, created_at, fmt="csv", size_bytes=path.stat().st_size,
+                            version=int(dataset_path(path.stem).exists()))
+        catalog.add_file(path.stem, path.stem, None, created_at)
+    shutil.rmtree(alias_dir, ignore_errors=True)
+
+def dataset_path(dataset_id: str, suffix: str = "parquet") -> Path:
+    """Path of an artifact stored for a dataset (raw ``csv``/``jsonl``/..., columnar ``parquet``, ...)."""
+    return DATA_DIR / f"{dataset_id}.{suffix}"
+
+def source_suffix(fmt: str) -> str:
+    """Suffix of a raw upload in the given format (``raw.parquet`` cannot clash with the columnar copy)."""
+    return f"raw.{fmt}"
+
+def source_path(dataset_id: str) -> Optional[Tuple[Path, str]]:
+    """The raw upload of a dataset and its format, or None if it is not stored."""
+    for fmt in SOURCE_FORMATS:
+        path = dataset_path(dataset_id, source_suffix(fmt))
+        if path.exists():
+            return path, fmt
+    # Uploads from before multi-format ingest are plain CSVs
+    path = dataset_path(dataset_id, "csv")
+    return (path, "csv") if path.exists() else None
+
+def source_paths(dataset_id: str) -> Sources:
+    """Every stored source of a dataset in order: the upload, then each batch of appended rows."""
+    found = source_path(dataset_id)
+    if found is None:
+        return []
+    return [found] + [(path, "jsonl") for path in sorted(DATA_DIR.glob(f"{dataset_id}.delta-*.jsonl"))]
+
+def columnar_paths(dataset_id: str) -> List[Path]:
+    """Parquet parts of a dataset: the converted sources, then rows appended since."""
+    return [dataset_path(dataset_id)] + sorted(DATA_DIR.glob(f"{dataset_id}.delta-*.parquet"))
+
+def resolve_dataset(file_id: str) -> str:
+    """Dataset an upload's file_id points at, refreshing its last-access time."""
+    catalog = get_catalog()
+    entry = catalog.lookup(file_id)
+    if entry is None:
+        raise FileNotFoundError(f"Dataset {file_id} not found")
+    now = time.time()
+    if now - entry["last_access"] > ACCESS_TOUCH_SECONDS:
+        catalog.touch(file_id, now)
+    return entry["dataset_id"]
+
+@contextmanager
+def _file_lock(name: str) -> Iterator[None]:
+    with open(DATA_DIR / f".{name}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def dataset_lock(dataset_id: str):
+    """Exclusive lock on a dataset across workers, held while it is ingested or purged."""
+    return _file_lock(dataset_id)
+
+def upload_lock(file_id: str):
+    """Exclusive lock on an upload across workers, held while rows are appended to it."""
+    return _file_lock(f"upload-{file_id}")
+
+def dataset_exists(file_id: str) -> bool:
+    """Whether an upload is in the catalog."""
+    return get_catalog().lookup(file_id) is not None
+
+def ingest_upload(dataset_id: str, source: Optional[dict] = None) -> dict:
+    """
+    Convert a raw upload (CSV, gzip CSV, Parquet or JSON Lines) into the typed columnar
+    store, streaming it in chunks. Date columns are parsed once here so later loads get
+    datetimes directly. Returns the dataset profile, which is persisted next to the data.
+    """
+    sources = source_paths(dataset_id)
+    if not sources:
+        raise FileNotFoundError(f"Dataset {dataset_id} not found")
     try:
-        df = pd.read_csv(path, nrows=nrows)
-        return df
+        profile = convert_source(sources, partial(dataset_path, dataset_id), source)
     except Exception as e:
-        raise ValueError(f"Failed to load CSV: {str(e)}")
+        raise ValueError(f"Failed to load {sources[0][1]} upload: {str(e)}")
+    # Appended rows are now part of the main Parquet file
+    for path in columnar_paths(dataset_id)[1:]:
+        path.unlink()
+    get_catalog().record_ingest(dataset_id, profile)
+    return profile
+
+def ensure_ingested(dataset_id: str, source: Optional[dict] = None) -> None:
+    """Run ingest for datasets the catalog has no converted version of (new, or stored before the store existed)."""
+    if get_catalog().version(dataset_id):
+        return
+    with dataset_lock(dataset_id):
+        if get_catalog().version(dataset_id):
+            return  # another worker finished it while we waited
+        ingest_upload(dataset_id, source)
+
+def upload_staging_path() -> Path:
+    """Where an upload is streamed before its content hash is known."""
+    return UPLOAD_DIR / f"{uuid.uuid4().hex}.part"
+
+def register_upload(staged: Path, fmt: str, size_bytes: int, content_hash: str,
+                    filename: Optional[str] = None) -> Tuple[str, dict, bool]:
+    """
+    Store a streamed upload of the given format under its content hash and catalog a
+    new file_id for it. Bytes already stored are not kept twice and not re-ingested.
+    The file_id is only catalogued once the data converted; a file that fails to convert
+    is removed again and the error raised. Returns ``(file_id, profile, deduplicated)``.
+    """
+    dataset_id = content_hash
+    catalog = get_catalog()
+    now = time.time()
+    with dataset_lock(dataset_id):
+        deduplicated = source_path(dataset_id) is not None
+        if deduplicated:
+            staged.unlink(missing_ok=True)
+        else:
+            os.replace(staged, dataset_path(dataset_id, source_suffix(fmt)))
+        catalog.add_dataset(dataset_id, now, content_hash=content_hash, fmt=fmt, size_bytes=size_bytes)
+        if not catalog.version(dataset_id):
+            try:
+                ingest_upload(dataset_id, {"size_bytes": size_bytes, "content_hash": content_hash})
+            except Exception:
+                if not catalog.file_count(dataset_id):
+                    _remove_dataset_files(dataset_id)
+                raise
+        file_id = str(uuid.uuid4())
+        catalog.add_file(file_id, dataset_id, filename, now)
+    return file_id, load_profile(file_id), deduplicated
+
+def _derive_dataset(parent_id: str, dataset_id: str, payload: bytes, source: dict) -> dict:
+    """
+    Create ``dataset_id`` as ``parent_id`` plus the appended rows in ``payload``. The
+    parent's files are hard-linked (every write replaces files, so they stay shared safely),
+    then the rows are folded in, or everything is converted again when they change a type.
+    """
+    for path in DATA_DIR.glob(f"{dataset_id}.*"):
+        path.unlink()  # left over from an append that failed
+    with dataset_lock(parent_id):
+        for path in DATA_DIR.glob(f"{parent_id}.*"):
+            if ".tmp-" not in path.name and not path.name[len(parent_id) + 1:].startswith("insights"):
+                os.link(path, dataset_path(dataset_id, path.name[len(parent_id) + 1:]))
+    part = f"delta-{len(source_paths(dataset_id)):05d}"
+    delta_path = dataset_path(dataset_id, f"{part}.jsonl")
+    delta_path.write_bytes(payload)
+    profile = append_source(delta_path, dataset_path(dataset_id, f"{part}.parquet"),
+                            partial(dataset_path, dataset_id), source)
+    if profile is None:
+        print(f"Appended rows change column types or roles of {parent_id}, converting it again")
+        return ingest_upload(dataset_id, source)
+    get_catalog().record_ingest(dataset_id, profile)
+    return profile
+
+def append_rows(file_id: str, rows: List[Dict[str, Any]]) -> dict:
+    """
+    Append rows (column -> value) to an upload and return its updated profile.
+    Statistics, sample and insight aggregates are updated from the new rows alone.
+    The upload then points at a new dataset identified by its parent and the appended
+    bytes; the parent is removed once no other upload shares it. Appends to the same
+    upload run one at a time, so each derives from the dataset the previous one left.
+    """
+    if not rows:
+        raise ValueError("No rows to append")
+    with upload_lock(file_id):
+        parent_id = resolve_dataset(file_id)
+        profile = load_profile(file_id)
+        unknown = sorted({name for row in rows for name in row} - set(profile["columns"]))
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        payload = "".join(json.dumps(row, default=str) + "\n" for row in rows).encode()
+        dataset_id = hashlib.sha256(f"{parent_id}:{hashlib.sha256(payload).hexdigest()}".encode()).hexdigest()
+        source = {**profile["source"], "appended_rows": profile["source"].get("appended_rows", 0) + len(rows)}
+        catalog = get_catalog()
+        with dataset_lock(dataset_id):
+            if not catalog.version(dataset_id):
+                catalog.add_dataset(dataset_id, time.time(), content_hash=source.get("content_hash"),
+                                    fmt=source.get("format"), size_bytes=source.get("size_bytes"))
+                _derive_dataset(parent_id, dataset_id, payload, source)
+        catalog.move_file(file_id, dataset_id)
+        purge_dataset(parent_id)
+    return load_profile(file_id)
+
+def dataset_version(dataset_id: str) -> int:
+    """Catalog version of a stored dataset, bumped whenever its Parquet copy is rewritten."""
+    return get_catalog().version(dataset_id)
+
+def _cache_loaded(dataset_id: str, version: int, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Register a freshly loaded frame with the caches. With the cross-worker cache
+    enabled the frame is swapped for a zero-copy view of the shared columns.
+    """
+    shared = get_shared_cache()
+    if shared is not None:
+        try:
+            shared.put(dataset_id, version, df)
+            # None when the frame is larger than the shared budget or was evicted meanwhile
+            attached = shared.get(dataset_id, version)
+            if attached is not None:
+                df = attached
+        except OSError as e:
+            print(f"Shared dataset cache unavailable, keeping a private copy: {e}")
+    get_dataset_cache().put(dataset_id, version, df)
+    return df
+
+def _read_columnar(dataset_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    paths = columnar_paths(dataset_id)
+    if len(paths) == 1:
+        return pd.read_parquet(paths[0], columns=columns)
+    return pq.read_table(paths, columns=columns).to_pandas()
+
+def load_dataset(file_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load an uploaded dataset from the columnar store.
+    Lookups go through the in-process cache, then the cross-worker shared cache
+    (when SHARED_CACHE_DIR is set), then Parquet; uploads made before the store
+    existed are converted on first access. Caches are keyed by content, so every
+    upload of the same bytes shares one entry.
+    """
+    dataset_id = resolve_dataset(file_id)
+    ensure_ingested(dataset_id)
+    version = dataset_version(dataset_id)
+    df = get_dataset_cache().get(dataset_id, version)
+    if df is None:
+        shared = get_shared_cache()
+        if columns is not None:
+            df = shared.get(dataset_id, version, columns) if shared is not None else None
+            return df[columns] if df is not None else _read_columnar(dataset_id, columns)
+        df = shared.get(dataset_id, version) if shared is not None else None
+        if df is None:
+            df = _cache_loaded(dataset_id, version, _read_columnar(dataset_id))
+        else:
+            get_dataset_cache().put(dataset_id, version, df)
+    return df[columns] if columns is not None else df
+
+def load_sample(file_id: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Load the deterministic sample persisted at upload (at most ``SAMPLE_ROWS`` rows,
+    the whole dataset when it is smaller). Chart requests are served from it.
+    """
+    dataset_id = resolve_dataset(file_id)
+    ensure_ingested(dataset_id)
+    key = f"{dataset_id}#sample"
+    version = dataset_version(dataset_id)
+    cache = get_dataset_cache()
+    df = cache.get(key, version)
+    if df is None:
+        path = dataset_path(dataset_id, "sample.parquet")
+        if columns is not None:
+            return pd.read_parquet(path, columns=columns)
+        df = pd.read_parquet(path)
+        cache.put(key, version, df)
+    return df[columns] if columns is not None else df
+
+def load_schema(file_id: str) -> pd.DataFrame:
+    """Zero-row frame with the stored column names and dtypes, read from the Parquet footer only."""
+    dataset_id = resolve_dataset(file_id)
+    ensure_ingested(dataset_id)
+    return pq.read_schema(dataset_path(dataset_id)).empty_table().to_pandas()
+
+def load_profile(file_id: str) -> dict:
+    """
+    Dataset profile persisted at ingest: schema features, per-column statistics,
+    cardinalities and roles. Profiles from an older layout are rebuilt.
+    """
+    dataset_id = resolve_dataset(file_id)
+    ensure_ingested(dataset_id)
+    with open(dataset_path(dataset_id, "profile.json")) as f:
+        profile = json.load(f)
+    if profile.get("version") != PROFILE_VERSION:
+        with dataset_lock(dataset_id):
+            profile = ingest_upload(dataset_id, profile.get("source"))
+    return profile
+
+def load_aggregates(file_id: str) -> InsightAggregates:
+    """Insight aggregates kept up to date at ingest and on every append."""
+    dataset_id = resolve_dataset(file_id)
+    load_profile(file_id)  # rebuilds datasets ingested before aggregates were kept
+    with open(dataset_path(dataset_id, "aggregates.json")) as f:
+        return InsightAggregates.from_dict(json.load(f))
+
+def load_sketches(file_id: str) -> DatasetSketches:
+    """Sketches behind the approximate insights, kept up to date like the aggregates."""
+    dataset_id = resolve_dataset(file_id)
+    load_profile(file_id)  # rebuilds datasets ingested before sketches were kept
+    with open(dataset_path(dataset_id, "sketches.json")) as f:
+        return DatasetSketches.from_dict(json.load(f))
+
+def load_correlations(file_id: str) -> CorrelationMatrix:
+    """Correlation matrix of the numeric columns over every row, kept up to date like the aggregates."""
+    dataset_id = resolve_dataset(file_id)
+    load_profile(file_id)  # rebuilds datasets ingested before correlations were kept
+    with open(dataset_path(dataset_id, "correlations.json")) as f:
+        return CorrelationMatrix.from_dict(json.load(f))
+
+def load_rollups(file_id: str) -> Optional[TimeRollups]:
+    """Day/week/month rollups over the dataset's date column, or None when it has no date column."""
+    dataset_id = resolve_dataset(file_id)
+    date_col = load_profile(file_id)["semantic_roles"]["date"]  # rebuilds datasets ingested before rollups were kept
+    if date_col is None:
+        return None
+    return TimeRollups.from_frame(pd.read_parquet(dataset_path(dataset_id, "rollups.parquet")), date_col)
+
+def _analysis_cache(file_id: str, approximate: bool) -> Tuple[Path, Dict[str, Any]]:
+    """Path of the analysis cached for an upload and the key it must carry to be current."""
+    dataset_id = resolve_dataset(file_id)
+    path = dataset_path(dataset_id, "insights-approximate.json" if approximate else "insights.json")
+    return path, {"dataset_id": dataset_id, "version": dataset_version(dataset_id), "analyzer_version": ANALYZER_VERSION}
+
+def cached_analysis(file_id: str, approximate: bool = False) -> Optional[Dict[str, Any]]:
+    """The analysis ``load_analysis`` would return when it is already cached and current, else None."""
+    path, key = _analysis_cache(file_id, approximate)
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return cached["analysis"] if cached.get("key") == key else None
+
+def load_analysis(file_id: str, approximate: bool = False) -> Dict[str, Any]:
+    """
+    ``DataInsightsEngine.analyze()`` of an upload, cached on disk next to the dataset.
+    The cache is keyed by the dataset (its content hash), its catalog version and
+    ANALYZER_VERSION, so rewriting or appending to the data, or changing the analyzers,
+    recomputes it. ``approximate`` answers from the sketches and is cached separately.
+    """
+    profile = load_profile(file_id)
+    analysis = cached_analysis(file_id, approximate)
+    if analysis is not None:
+        return analysis
+    engine = DataInsightsEngine(load_schema(file_id), profile=profile, aggregates=load_aggregates(file_id),
+                                sketches=load_sketches(file_id) if approximate else None,
+                                rollups=load_rollups(file_id), correlations=load_correlations(file_id),
+                                paths=columnar_paths(resolve_dataset(file_id)))
+    analysis = engine.analyze()
+    # An analysis missing a timed-out analyzer is served but not kept
+    if all(timing["status"] != "timeout" for timing in analysis["timings"].values()):
+        path, key = _analysis_cache(file_id, approximate)
+        write_json({"key": key, "analysis": analysis}, path)
+    return analysis
+
+def load_sample_analysis(file_id: str) -> Dict[str, Any]:
+    """
+    Approximate analysis of an upload whose cost does not grow with the data: the
+    aggregates are computed on the persisted sample and scaled up to the row count, and
+    distinct counts, top groups and quantiles come from the sketches. The rollups and
+    correlations are read as kept. Not cached; it stands in until ``load_analysis`` is done.
+    """
+    profile = load_profile(file_id)
+    sample = load_sample(file_id)
+    engine = DataInsightsEngine(sample, profile=profile, sketches=load_sketches(file_id),
+                                rollups=load_rollups(file_id), correlations=load_correlations(file_id),
+                                population=profile["num_rows"])
+    analysis = engine.analyze()
+    analysis["sample_rows"] = len(sample)
+    return analysis
+
+def export_csv(dataset_id: str) -> Iterator[str]:
+    """The stored rows of a dataset as CSV text, one Parquet batch at a time."""
+    header = True
+    for path in columnar_paths(dataset_id):
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield batch.to_pandas().to_csv(index=False, header=header)
+            header = False
+
+def stored_datasets() -> Dict[str, dict]:
+    """Datasets on disk with their total size and last modification: ``{dataset_id: {"bytes", "modified"}}``."""
+    datasets: Dict[str, dict] = {}
+    for path in DATA_DIR.iterdir():
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        st = path.stat()
+        entry = datasets.setdefault(path.name.split(".")[0], {"bytes": 0, "modified": 0.0})
+        entry["bytes"] += st.st_size
+        entry["modified"] = max(entry["modified"], st.st_mtime)
+    return datasets
+
+def last_modified(dataset_id: str) -> float:
+    """Latest write to any file of a stored dataset (0 when it has none)."""
+    return max((path.stat().st_mtime for path in DATA_DIR.glob(f"{dataset_id}.*")), default=0.0)
+
+def _remove_dataset_files(dataset_id: str) -> None:
+    """Forget a dataset and delete its files and cached copies; the caller holds its lock."""
+    get_catalog().remove_dataset(dataset_id)
+    for path in DATA_DIR.glob(f"{dataset_id}.*"):
+        path.unlink(missing_ok=True)
+    get_dataset_cache().invalidate(dataset_id)
+    get_dataset_cache().invalidate(f"{dataset_id}#sample")
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.invalidate(dataset_id)
+
+def purge_dataset(dataset_id: str, force: bool = False, accessed_before: Optional[float] = None) -> bool:
+    """
+    Remove a stored dataset and everything derived from it once no upload refers to it.
+    With ``force`` the uploads pointing at it are dropped as well. With ``accessed_before``
+    it is kept when it was used, uploaded again or written after that time; this is checked
+    under the dataset lock, so a sweep never evicts a dataset that was just used.
+    Returns whether it was removed.
+    """
+    catalog = get_catalog()
+    with dataset_lock(dataset_id):
+        if not force and catalog.file_count(dataset_id):
+            return False
+        if accessed_before is not None:
+            last_access = catalog.dataset_last_access(dataset_id)
+            if (last_access if last_access is not None else last_modified(dataset_id)) > accessed_before:
+                return False
+        _remove_dataset_files(dataset_id)
+    return True
+
+def delete_dataset(file_id: str) -> bool:
+    """
+    Remove an upload. The stored dataset goes too once it was the last upload of those bytes.
+    Returns False if it did not exist.
+    """
+    entry = get_catalog().lookup(file_id)
+    if entry is None:
+        return False
+    get_catalog().remove_file(file_id)
+    purge_dataset(entry["dataset_id"])
+    return True
@@ -0,0 +1,87 @@
+# backend/app/dataset_cache.py
+# In-process LRU cache of loaded datasets, bounded by a memory budget
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import pandas as pd
+
+DEFAULT_CACHE_MB = 512
+
+
+class DatasetCache:
+    """
+    LRU cache of DataFrames keyed by file_id and content version.
+
+    Entries are weighed with ``DataFrame.memory_usage(deep=True)`` and the least
+    recently used ones are evicted once the byte budget is exceeded. Cached frames
+    are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple[Any, pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_id: str, version: Any) -> Optional[pd.DataFrame]:
+        """Return the cached frame for this version of the dataset, or None."""
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(file_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, file_id: str, version: Any, df: pd.DataFrame) -> None:
+        """Cache a frame, replacing older versions and evicting LRU entries to fit the budget."""
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._drop(file_id)
+            if size > self.max_bytes:
+                return
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+            self._entries[file_id] = (version, df, size)
+            self.current_bytes += size
+
+    def invalidate(self, file_id: str) -> None:
+        """Forget every cached version of a dataset."""
+        with self._lock:
+            self._drop(file_id)
+
+    def _drop(self, file_id: str) -> None:
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_cache = None
+
+def get_dataset_cache() -> DatasetCache:
+    global _cache
+    if _cache is None:
+        max_mb = float(os.getenv("DATASET_CACHE_MB", DEFAULT_CACHE_MB))
+        _cache = DatasetCache(int(max_mb * 1024 * 1024))
+    return _cache
@@ -0,0 +1,160 @@
+# backend/app/dataset_profile.py
+# Versioned dataset profile computed once at upload and read by every endpoint
+import math
+from typing import Any, Dict, List, Optional
+from app.column_roles import KEY_SUFFIXES, role_index
+from app.frame_statistics import STAT_QUANTILES, quantile_label
+from app.sketches import HyperLogLog
+
+# Bump whenever the profile or the artifacts stored with it change; stale ones are rebuilt on access
+PROFILE_VERSION = 16
+
+ID_SUFFIXES = ("id", "_id", "uuid", "key", "code")
+# Columns whose distinct count is estimated count as unique within three standard errors of the sketch
+UNIQUE_TOLERANCE = 3 * HyperLogLog().relative_error
+# Quantiles kept per numeric column: the median, then the ones of ``calculate_statistics``
+PROFILE_QUANTILES = [0.5] + STAT_QUANTILES
+
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    return float(value) if value is not None and math.isfinite(value) else None
+
+
+def _skew(n: int, m2: float, m3: float) -> Optional[float]:
+    """Adjusted Fisher-Pearson skewness from central moment sums, as pandas computes it."""
+    if n < 3:
+        return None
+    if m2 <= 0:
+        return 0.0
+    return _finite(math.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / (m2 / n) ** 1.5)
+
+
+def column_role(name: str, kind: str, dtype: str, cardinality: int, non_null: int, capped: bool = False) -> str:
+    """
+    Structural role of a column: ``date``, ``measure``, ``dimension``, ``identifier``,
+    ``flag`` or free ``text``. ``capped`` cardinalities are HyperLogLog estimates.
+    """
+    if kind == "datetime":
+        return "date"
+    if kind == "bool":
+        return "flag"
+    if capped:
+        unique = cardinality >= non_null * (1 - UNIQUE_TOLERANCE)
+    else:
+        unique = non_null > 1 and cardinality == non_null
+    if kind in ("int", "float"):
+        if kind == "int" and (unique and name.lower().endswith(ID_SUFFIXES) or name.lower().endswith(KEY_SUFFIXES)):
+            return "identifier"
+        return "measure"
+    if unique or name.lower().endswith(ID_SUFFIXES):
+        return "identifier"
+    return "dimension" if dtype == "category" else "text"
+
+
+def profile_columns(summary, details: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-column entries of the profile from a merged ``DatasetSummary`` (medians and
+    quantiles are added by ``build_profile``). ``details`` are the column details of ``summary.to_schema()``.
+    """
+    if details is None:
+        details = {c["name"]: c for c in summary.to_schema()["columns"]}
+    kinds = summary.storage_kinds()
+    columns = {}
+    for name, col in summary.columns.items():
+        kind = kinds[name]
+        dtype = details[name]["dtype"]
+        entry = {
+            "dtype": dtype,
+            "kind": kind,
+            "role": column_role(name, kind, dtype, col.cardinality, col.count - col.null_count, col.distinct_overflow),
+            "null_count": col.null_count,
+            "cardinality": col.cardinality,
+            "cardinality_capped": col.distinct_overflow,
+            "sample_values": details[name]["sample_values"]
+        }
+        if kind in ("int", "float"):
+            entry.update({
+                "min": _finite(col.min),
+                "max": _finite(col.max),
+                "mean": _finite(col.mean) if col.value_count else None,
+                "std": _finite(math.sqrt(col.m2 / (col.value_count - 1))) if col.value_count > 1 else None,
+                "skew": _skew(col.value_count, col.m2, col.m3),
+                "zeros": col.zeros
+            })
+        columns[name] = entry
+    return columns
+
+
+def build_profile(summary, quantiles: Dict[str, List[Optional[float]]], dtype_report: Dict[str, Any],
+                  source: Optional[Dict[str, Any]] = None,
+                  rank_errors: Optional[Dict[str, List[float]]] = None) -> Dict[str, Any]:
+    """
+    Assemble the profile from a merged ``DatasetSummary`` and the ``PROFILE_QUANTILES``
+    of its numeric columns. ``rank_errors`` marks quantiles that are t-digest estimates
+    rather than exact values.
+    """
+    schema = summary.to_schema()
+    columns = profile_columns(summary, {c["name"]: c for c in schema.pop("columns")})
+    roles: Dict[str, List[str]] = {}
+    for name, entry in columns.items():
+        if entry["kind"] in ("int", "float"):
+            median, *rest = quantiles.get(name) or [None] * len(PROFILE_QUANTILES)
+            entry["median"] = _finite(median)
+            entry["quantiles"] = {quantile_label(q): _finite(v) for q, v in zip(STAT_QUANTILES, rest)}
+            errors = (rank_errors or {}).get(name)
+            entry["quantile_rank_error"] = dict(zip(["median"] + [quantile_label(q) for q in STAT_QUANTILES],
+                                                    errors)) if errors is not None else None
+        roles.setdefault(entry["role"], []).append(name)
+    return {
+        "version": PROFILE_VERSION,
+        "num_rows": summary.num_rows,
+        "num_columns": len(columns),
+        "schema": schema,
+        "columns": columns,
+        "roles": roles,
+        "semantic_roles": role_index(columns),
+        "dtype_report": dtype_report,
+        "bytes_saved": sum(entry["bytes_saved"] for entry in dtype_report.values()),
+        "source": source or {}
+    }
+
+
+def upload_summary(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The ``/api/upload`` summary: schema features, column details and the ingest report."""
+    return {
+        **profile["schema"],
+        "columns": [
+            {"name": name, "dtype": col["dtype"], "sample_values": col["sample_values"]}
+            for name, col in profile["columns"].items()
+        ],
+        "dtype_report": profile["dtype_report"],
+        "bytes_saved": profile["bytes_saved"],
+        **profile["source"]
+    }
+
+
+def profile_statistics(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """``DataInsightsEngine.calculate_statistics`` answered from the profile, without touching the data."""
+    columns = profile["columns"]
+    rows, num_columns = profile["num_rows"], profile["num_columns"]
+    total_missing = sum(col["null_count"] for col in columns.values())
+    cells = rows * num_columns
+    return {
+        'shape': {
+            'rows': int(rows),
+            'columns': int(num_columns)
+        },
+        'columns': {
+            'numeric': sum(col["kind"] in ("int", "float") for col in columns.values()),
+            'categorical': sum(col["kind"] == "string" for col in columns.values()),
+            'datetime': sum(col["kind"] == "datetime" for col in columns.values())
+        },
+        'missing': {
+            'total_missing': int(total_missing),
+            'missing_percentage': float(total_missing / cells * 100) if cells else 0.0
+        },
+        'numeric_stats': {
+            name: {stat: col[stat] for stat in ("mean", "median", "std", "min", "max", "quantiles", "skew", "zeros")}
+            for name, col in columns.items() if col["kind"] in ("int", "float")
+        }
+    }
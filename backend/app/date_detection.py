@@ -0,0 +1,101 @@
+# backend/app/date_detection.py
+# Sampled date-column sniffing with explicit, cached formats
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+# Candidate formats, tried in order; ties go to the earlier (month-first before day-first)
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%Y-%m",
+    "%b %Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "ISO8601",
+]
+DATE_SNIFF_ROWS = 200
+DATE_PARSE_THRESHOLD = 0.6
+
+
+def sniff_date_format(values: pd.Series, sample_size: int = DATE_SNIFF_ROWS) -> Optional[str]:
+    """
+    Find the format that parses the most of a small, evenly spaced sample of values.
+    Returns None when no candidate parses more than DATE_PARSE_THRESHOLD of it.
+    """
+    values = values.dropna()
+    if values.empty:
+        return None
+    if len(values) > sample_size:
+        values = values.iloc[np.linspace(0, len(values) - 1, sample_size).astype(int)]
+    values = values.astype(str)
+    # Bare numbers (ids, amounts, years) are not dates
+    if values.str.fullmatch(r"[+-]?\d+(\.\d+)?").mean() > 0.5:
+        return None
+    best_format, best_rate = None, DATE_PARSE_THRESHOLD
+    for fmt in DATE_FORMATS:
+        rate = pd.to_datetime(values, format=fmt, errors="coerce").notna().mean()
+        if rate > best_rate:
+            best_format, best_rate = fmt, rate
+            if rate == 1.0:
+                break
+    return best_format
+
+
+def parse_dates(ser: pd.Series, fmt: str) -> pd.Series:
+    """Parse a whole column with a format found by ``sniff_date_format``."""
+    return pd.to_datetime(ser, format=fmt, errors="coerce")
+
+
+class DateShape:
+    """Mergeable facts about parsed dates that decide a column's granularity."""
+
+    def __init__(self):
+        self.count = 0
+        self.midnight = True
+        self.month_start = True
+        self.year_start = True
+        self.weekdays: set = set()
+
+    @classmethod
+    def from_parsed(cls, parsed: pd.Series) -> "DateShape":
+        shape = cls()
+        parsed = parsed.dropna()
+        shape.count = len(parsed)
+        if shape.count:
+            shape.midnight = bool((parsed == parsed.dt.normalize()).all())
+            shape.month_start = bool((parsed.dt.day == 1).all())
+            shape.year_start = shape.month_start and bool((parsed.dt.month == 1).all())
+            shape.weekdays = set(parsed.dt.weekday.unique().tolist())
+        return shape
+
+    def merge(self, other: "DateShape") -> None:
+        self.count += other.count
+        self.midnight = self.midnight and other.midnight
+        self.month_start = self.month_start and other.month_start
+        self.year_start = self.year_start and other.year_start
+        self.weekdays |= other.weekdays
+
+    @property
+    def granularity(self) -> Optional[str]:
+        if self.count <= 1:
+            return None
+        if not self.midnight:
+            return "intraday"
+        if self.year_start:
+            return "yearly"
+        if self.month_start:
+            return "monthly"
+        if len(self.weekdays) == 1:
+            return "weekly"
+        return "daily"
@@ -0,0 +1,735 @@
+# backend/app/ingest.py
+# Streaming ingest: uploads are written, hashed, profiled and converted chunk by chunk
+import hashlib
+import itertools
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.column_roles import insight_roles, role_index
+from app.correlations import CorrelationMatrix, correlation_columns
+from app.dataset_profile import ID_SUFFIXES, PROFILE_QUANTILES, build_profile, profile_columns
+from app.date_detection import DATE_PARSE_THRESHOLD, DateShape, parse_dates, sniff_date_format
+from app.chunked_analysis import chunked_quantiles
+from app.insight_aggregates import InsightAggregates
+from app.partitioned import parquet_aggregates
+from app.sketches import DatasetSketches, HyperLogLog
+from app.time_rollups import TimeRollups
+from app.readers import CSV_ENGINE, cast_chunk, iter_chunks, read_csv_arrow, read_spilled, spill_fits
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Distinct values tracked exactly per column; beyond this a HyperLogLog estimates the cardinality
+# (kept well above CATEGORY_MAX_CARDINALITY, so category detection stays exact)
+DISTINCT_CAP = 10_000
+SAMPLE_VALUES = 3
+# Persisted sample used to serve chart requests without reading the full dataset
+SAMPLE_ROWS = 5000
+SAMPLE_SEED = 42
+SAMPLE_STRATIFY = os.getenv("SAMPLE_STRATIFY", "1") != "0"
+MAX_STRATA = 50
+
+# Integer columns are narrowed to a type whose range is this many times the one seen
+INT_HEADROOM = 4
+# Identifier-like integer columns (customer_id, order_key, ...) keep growing as rows are
+# appended, so they are never stored narrower than this
+ID_MIN_INT_TYPE = np.int32
+# Text columns with at most this many distinct values (and repeating values) become categories
+CATEGORY_MAX_CARDINALITY = 1000
+
+PANDAS_DTYPES = {
+    "int": "int64",
+    "float": "float64",
+    "bool": "bool",
+    "string": "object",
+    "datetime": "datetime64[ns]",
+}
+
+# A dataset is read from one or more stored sources: the upload, then any appended rows
+Sources = List[Tuple[Path, str]]
+
+
+async def stream_upload(upload, dest: Path) -> Tuple[int, str]:
+    """Write an UploadFile to disk chunk by chunk, hashing the bytes as they arrive."""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(dest, "wb") as f:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return size, hasher.hexdigest()
+
+
+def _kind_of(ser: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(ser):
+        return "bool"
+    if pd.api.types.is_integer_dtype(ser):
+        return "int"
+    if pd.api.types.is_float_dtype(ser):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(ser):
+        return "datetime"
+    return "string"
+
+
+def _merge_kinds(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if {a, b} == {"int", "float"}:
+        return "float"
+    return "string"
+
+
+class ColumnSummary:
+    """Mergeable per-column statistics gathered from one or more chunks."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.null_count = 0
+        self.kind: Optional[str] = None
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        # Running moments of the numeric values (merged with Chan's and Pébay's parallel updates)
+        self.value_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.zeros = 0
+        self.distinct: set = set()
+        self.distinct_overflow = False
+        # Distinct-count sketch replacing ``distinct`` once it overflows DISTINCT_CAP
+        self.distinct_sketch: Optional[HyperLogLog] = None
+        self.first_values: List[Any] = []
+        self.date_format: Optional[str] = None
+        self.date_parsed = 0
+        self.date_shape = DateShape()
+        self.float32_exact = True
+
+    @classmethod
+    def from_series(cls, ser: pd.Series, date_format: Optional[str] = None) -> "ColumnSummary":
+        col = cls(ser.name)
+        col.count = len(ser)
+        col.null_count = int(ser.isnull().sum())
+        # An all-null chunk says nothing about the column type
+        col.kind = _kind_of(ser) if col.null_count < col.count else None
+        if col.kind in ("int", "float") and col.null_count < col.count:
+            col.min = float(ser.min())
+            col.max = float(ser.max())
+            values = ser.dropna().to_numpy(dtype=np.float64)
+            col.value_count = len(values)
+            col.mean = float(values.mean())
+            deviation = values - col.mean
+            col.m2 = float((deviation ** 2).sum())
+            col.m3 = float((deviation ** 3).sum())
+            col.zeros = int((values == 0).sum())
+            col.float32_exact = bool(np.array_equal(values.astype(np.float32), values))
+        values = ser.dropna().unique()
+        if len(values) > DISTINCT_CAP:
+            col.distinct_overflow = True
+            col.distinct_sketch = HyperLogLog()
+            col.distinct_sketch.update(ser)
+        else:
+            col.distinct = set(values.tolist())
+        col.first_values = ser.head(SAMPLE_VALUES).tolist()
+        if col.kind == "string" and date_format is not None:
+            col.date_format = date_format
+            col.date_shape = DateShape.from_parsed(parse_dates(ser, date_format))
+            col.date_parsed = col.date_shape.count
+        elif col.kind == "datetime":
+            col.date_shape = DateShape.from_parsed(ser)
+            col.date_parsed = col.date_shape.count
+        return col
+
+    def merge(self, other: "ColumnSummary") -> None:
+        """Fold another chunk's statistics into this one."""
+        self.count += other.count
+        self.null_count += other.null_count
+        kind = _merge_kinds(self.kind, other.kind)
+        if kind in ("int", "float"):
+            mins = [v for v in (self.min, other.min) if v is not None]
+            maxs = [v for v in (self.max, other.max) if v is not None]
+            self.min = min(mins) if mins else None
+            self.max = max(maxs) if maxs else None
+            n_a, n_b = self.value_count, other.value_count
+            n = n_a + n_b
+            if n:
+                delta = other.mean - self.mean
+                self.m3 += (other.m3 + delta ** 3 * n_a * n_b * (n_a - n_b) / (n * n)
+                            + 3 * delta * (n_a * other.m2 - n_b * self.m2) / n)
+                self.m2 += other.m2 + delta * delta * n_a * n_b / n
+                self.mean += delta * n_b / n
+            self.value_count = n
+            self.zeros += other.zeros
+        else:
+            self.min = self.max = None
+            self.value_count, self.mean, self.m2, self.m3, self.zeros = 0, 0.0, 0.0, 0.0, 0
+        self.kind = kind
+        if not self.distinct_overflow and not other.distinct_overflow:
+            self.distinct |= other.distinct
+            if len(self.distinct) > DISTINCT_CAP:
+                self._overflow()
+        else:
+            self._overflow()
+            if other.distinct_overflow:
+                self.distinct_sketch.merge(other.distinct_sketch)
+            else:
+                self.distinct_sketch.update(pd.Series(list(other.distinct)))
+        self.first_values = (self.first_values + other.first_values)[:SAMPLE_VALUES]
+        self.date_format = self.date_format or other.date_format
+        self.date_parsed += other.date_parsed
+        self.date_shape.merge(other.date_shape)
+        self.float32_exact = self.float32_exact and other.float32_exact
+
+    def _overflow(self) -> None:
+        """Switch from the exact distinct set to the HyperLogLog sketch."""
+        if self.distinct_overflow:
+            return
+        self.distinct_overflow = True
+        self.distinct_sketch = HyperLogLog()
+        self.distinct_sketch.update(pd.Series(list(self.distinct)))
+        self.distinct = set()
+
+    @property
+    def cardinality(self) -> int:
+        """Distinct non-null values: exact up to DISTINCT_CAP, a HyperLogLog estimate beyond."""
+        if self.distinct_overflow:
+            return max(DISTINCT_CAP + 1, round(self.distinct_sketch.estimate()))
+        return len(self.distinct)
+
+    @property
+    def is_date(self) -> bool:
+        return ((self.kind == "datetime" or (self.kind == "string" and self.date_format is not None))
+                and self.count > 0 and self.date_parsed / self.count > DATE_PARSE_THRESHOLD)
+
+    @property
+    def read_kind(self) -> str:
+        """Kind a reader should produce: dates held as text are parsed after reading."""
+        return "string" if self.kind == "string" else self.storage_kind
+
+    @property
+    def storage_kind(self) -> str:
+        """Type the column is stored with once every chunk has been seen."""
+        if self.is_date:
+            return "datetime"
+        if self.kind is None:
+            return "string"
+        if self.kind == "int" and self.null_count:
+            return "float"
+        if self.kind == "bool" and self.null_count:
+            return "string"
+        return self.kind
+
+    @property
+    def storage_dtype(self) -> Any:
+        """
+        Narrowest dtype that holds every value losslessly: the smallest integer type
+        covering [min, max] with ``INT_HEADROOM`` to spare, float32 when every value
+        round-trips, and a category for repetitive text. The headroom lets appended rows
+        that go a little past the range seen so far keep the stored type; identifier-like
+        columns start at ``ID_MIN_INT_TYPE``.
+        """
+        kind = self.storage_kind
+        if kind == "int":
+            int_types = (np.int8, np.int16, np.int32)
+            if str(self.name).lower().endswith(ID_SUFFIXES):
+                int_types = int_types[int_types.index(ID_MIN_INT_TYPE):]
+            for int_type in int_types:
+                info = np.iinfo(int_type)
+                if (self.min is not None and info.min / INT_HEADROOM <= self.min
+                        and self.max <= info.max / INT_HEADROOM):
+                    return np.dtype(int_type).name
+        if kind == "float" and self.float32_exact:
+            return "float32"
+        non_null = self.count - self.null_count
+        if (kind == "string" and not self.distinct_overflow
+                and 0 < self.cardinality <= CATEGORY_MAX_CARDINALITY and self.cardinality * 2 <= non_null):
+            return pd.CategoricalDtype(sorted({str(v) for v in self.distinct}))
+        return PANDAS_DTYPES[kind]
+
+
+def _arrow_type(dtype: Any) -> pa.DataType:
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype == "object":
+        return pa.string()
+    if dtype == "datetime64[ns]":
+        return pa.timestamp("ns")
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+class DatasetSummary:
+    """
+    Mergeable dataset statistics. Chunks are summarized independently and folded
+    together, so the final summary never needs the whole dataset in memory.
+    """
+
+    def __init__(self):
+        self.num_rows = 0
+        self.columns: Dict[str, ColumnSummary] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, date_formats: Optional[Dict[str, Optional[str]]] = None) -> "DatasetSummary":
+        date_formats = date_formats or {}
+        summary = cls()
+        summary.num_rows = len(df)
+        summary.columns = {col: ColumnSummary.from_series(df[col], date_formats.get(col)) for col in df.columns}
+        return summary
+
+    def merge(self, other: "DatasetSummary") -> None:
+        # Columns can be missing from some chunks (JSON lines); they count as nulls there
+        for name, col in self.columns.items():
+            if name not in other.columns:
+                col.count += other.num_rows
+                col.null_count += other.num_rows
+        for name, col in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(col)
+            else:
+                col.count += self.num_rows
+                col.null_count += self.num_rows
+                self.columns[name] = col
+        self.num_rows += other.num_rows
+
+    @property
+    def date_col(self) -> Optional[str]:
+        return next((c.name for c in self.columns.values() if c.is_date), None)
+
+    def strata_col(self) -> Optional[str]:
+        """Column the persisted sample is stratified on: the date column, else a low-cardinality text column."""
+        if self.date_col is not None:
+            return self.date_col
+        return next((c.name for c in self.columns.values()
+                     if c.storage_kind == "string" and 1 < c.cardinality <= MAX_STRATA), None)
+
+    def storage_kinds(self) -> Dict[str, str]:
+        return {name: col.storage_kind for name, col in self.columns.items()}
+
+    def read_kinds(self) -> Dict[str, str]:
+        return {name: col.read_kind for name, col in self.columns.items()}
+
+    def storage_dtypes(self) -> Dict[str, Any]:
+        return {name: col.storage_dtype for name, col in self.columns.items()}
+
+    def arrow_schema(self) -> pa.Schema:
+        return pa.schema([(name, _arrow_type(dtype)) for name, dtype in self.storage_dtypes().items()])
+
+    def empty_frame(self) -> pd.DataFrame:
+        """Zero-row frame with the stored columns and dtypes."""
+        return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in self.storage_dtypes().items()})
+
+    def to_schema(self) -> Dict[str, Any]:
+        """Upload summary (schema features and column details)."""
+        kinds = self.storage_kinds()
+        cols = list(self.columns.values())
+        numeric = [c for c in cols if kinds[c.name] in ("int", "float")]
+        date_columns = [{
+            "column": c.name,
+            "format": c.date_format,
+            "granularity": c.date_shape.granularity,
+            "parse_rate": c.date_parsed / c.count
+        } for c in cols if c.is_date]
+        date_col = date_columns[0]["column"] if date_columns else None
+        mins = [c.min for c in numeric if c.min is not None]
+        maxs = [c.max for c in numeric if c.max is not None]
+        ratio = 1.0
+        if mins and maxs:
+            min_v, max_v = min(mins), max(maxs)
+            if min_v == 0:
+                ratio = float("inf") if max_v != 0 else 1.0
+            else:
+                ratio = abs(max_v / min_v)
+        missing = [c.null_count / c.count for c in cols if c.count]
+        cardinalities = [c.cardinality for c in cols]
+        names = [c.name.lower() for c in cols]
+
+        dtypes = self.storage_dtypes()
+        columns = []
+        for c in cols:
+            values = c.first_values
+            if kinds[c.name] == "datetime":
+                values = parse_dates(pd.Series(values, dtype=object), c.date_format).tolist()
+            columns.append({
+                "name": c.name,
+                "dtype": str(dtypes[c.name]),
+                "sample_values": values
+            })
+
+        return {
+            "num_rows": self.num_rows,
+            "num_numeric": sum(kinds[c.name] in ("int", "float", "bool") for c in cols),
+            "num_categorical": sum(kinds[c.name] == "string" for c in cols),
+            "has_date": date_col is not None,
+            "date_col": date_col,
+            "time_granularity": date_columns[0]["granularity"] if date_columns else None,
+            "date_columns": date_columns,
+            "max_cardinality": max(cardinalities, default=0),
+            "median_missing_pct": float(np.median(missing)) if missing else 0.0,
+            "ratio_max_min": float(ratio if np.isfinite(ratio) else 1.0),
+            "lat_lon_present": any(n in ("lat", "latitude", "lon", "longitude") for n in names),
+            "country_code_present": any(n in ("country", "country_code", "iso3") for n in names),
+            "columns": columns
+        }
+
+
+def _summarize_chunks(chunks: Iterator[pd.DataFrame]) -> DatasetSummary:
+    summary = DatasetSummary()
+    # Each text column is sniffed once, on the first chunk holding values for it;
+    # every chunk is then parsed with that explicit format
+    date_formats: Dict[str, Optional[str]] = {}
+    for chunk in chunks:
+        for col in chunk.columns:
+            if col not in date_formats and _kind_of(chunk[col]) == "string" and chunk[col].notna().any():
+                date_formats[col] = sniff_date_format(chunk[col])
+        summary.merge(DatasetSummary.from_frame(chunk, date_formats))
+    return summary
+
+
+def _check_parsed(summary: DatasetSummary) -> None:
+    """Reject sources that parsed to nothing: no rows and no header naming a column."""
+    named = [name for name in summary.columns if not str(name).startswith("Unnamed: ") and str(name).isprintable()]
+    if not summary.num_rows and not named:
+        raise ValueError("no rows or header found")
+
+
+def iter_sources(sources: Sources, kinds: Optional[Dict[str, str]] = None,
+                 engine: str = CSV_ENGINE) -> Iterator[pd.DataFrame]:
+    """Chunks of every source of a dataset, in order."""
+    return itertools.chain.from_iterable(iter_chunks(path, fmt, kinds, engine) for path, fmt in sources)
+
+
+def summarize_source(sources: Sources, spill: Optional[Path] = None) -> Tuple[DatasetSummary, str]:
+    """
+    First pass: merge per-chunk statistics into one summary. Returns the summary and
+    the CSV engine that read the sources: when a later block of a CSV does not fit the
+    types the parallel reader inferred from the first one, the pass is redone with pandas.
+    A single CSV source read by the parallel reader also spills its parsed batches to
+    ``spill`` (see ``readers.read_csv_arrow``). Raises ``ValueError`` when nothing parses.
+    """
+    engine = CSV_ENGINE
+    try:
+        if spill is not None and len(sources) == 1 and sources[0][1] in ("csv", "csv.gz") and CSV_ENGINE == "arrow":
+            summary = _summarize_chunks(read_csv_arrow(sources[0][0], spill=spill))
+        else:
+            summary = _summarize_chunks(iter_sources(sources, engine=CSV_ENGINE))
+    except pa.ArrowInvalid as e:
+        if all(fmt not in ("csv", "csv.gz") for _, fmt in sources) or CSV_ENGINE == "pandas":
+            raise
+        print(f"Parallel CSV parse failed, re-reading with pandas: {e}")
+        if spill is not None:
+            spill.unlink(missing_ok=True)
+        summary, engine = _summarize_chunks(iter_sources(sources, engine="pandas")), "pandas"
+    _check_parsed(summary)
+    return summary, engine
+
+
+class ReservoirSample:
+    """
+    Deterministic bottom-k reservoir sample built one chunk at a time.
+
+    Every row draws a key from a seeded generator and the rows with the smallest
+    keys are kept, which is a uniform sample without replacement. When a strata
+    column is given, the smallest keys are kept per stratum and the final sample
+    is allocated proportionally, so small groups stay represented.
+    """
+
+    def __init__(self, size: int = SAMPLE_ROWS, seed: int = SAMPLE_SEED, strata_col: Optional[str] = None):
+        self.size = size
+        self.strata_col = strata_col
+        self._rng = np.random.default_rng(seed)
+        self._rows: Optional[pd.DataFrame] = None
+        self._strata_counts = pd.Series(dtype="int64")
+        self._seen = 0
+
+    def _strata(self, chunk: pd.DataFrame) -> pd.Series:
+        ser = chunk[self.strata_col]
+        if pd.api.types.is_datetime64_any_dtype(ser):
+            return (ser.dt.year * 100 + ser.dt.month).fillna(-1).astype("int64")
+        return ser.astype(object).fillna("").astype(str)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        candidates = chunk.assign(_row=np.arange(self._seen, self._seen + len(chunk)),
+                                  _key=self._rng.random(len(chunk)))
+        self._seen += len(chunk)
+        if self.strata_col is None:
+            if self._rows is not None and len(self._rows) >= self.size:
+                candidates = candidates[candidates["_key"] < self._rows["_key"].max()]
+            combined = pd.concat([self._rows, candidates]) if self._rows is not None else candidates
+            self._rows = combined.nsmallest(self.size, "_key")
+            return
+        candidates["_stratum"] = self._strata(chunk).to_numpy()
+        self._strata_counts = self._strata_counts.add(candidates["_stratum"].value_counts(), fill_value=0)
+        if self._rows is not None:
+            # Strata whose reservoir is full only admit keys below their current maximum
+            keys = self._rows.groupby("_stratum")["_key"].agg(["size", "max"])
+            cutoff = keys["max"].where(keys["size"] >= self.size, np.inf)
+            candidates = candidates[candidates["_key"] < candidates["_stratum"].map(cutoff).fillna(np.inf)]
+        combined = pd.concat([self._rows, candidates]) if self._rows is not None else candidates
+        self._rows = combined.sort_values("_key").groupby("_stratum", sort=False).head(self.size)
+
+    def _quotas(self) -> pd.Series:
+        """
+        Rows kept per stratum: its share of ``size`` by largest-remainder rounding, at least
+        one row each, and never more than ``size`` in total (the excess of strata kept at
+        one row comes out of the largest ones).
+        """
+        share = self._strata_counts / self._strata_counts.sum() * self.size
+        quota = np.floor(share).clip(lower=1).astype(int)
+        spare = self.size - int(quota.sum())
+        if spare > 0:
+            remainder = (share - quota).sort_values(ascending=False, kind="stable")
+            quota[remainder.index[:spare]] += 1
+        while spare < 0 and quota.max() > 1:
+            quota[quota.idxmax()] -= 1
+            spare += 1
+        return quota
+
+    def result(self) -> pd.DataFrame:
+        """The sample in original row order, indexed by the rows' positions in the dataset."""
+        if self._rows is None:
+            return pd.DataFrame()
+        rows = self._rows
+        if self.strata_col is not None:
+            quota = self._quotas()
+            rows = rows.sort_values("_key")
+            rank = rows.groupby("_stratum", sort=False).cumcount()
+            rows = rows[rank < rows["_stratum"].map(quota)].drop(columns="_stratum")
+        return rows.sort_values("_row").set_index("_row").rename_axis(None).drop(columns="_key")
+
+
+def cast_storage(chunk: pd.DataFrame, summary: DatasetSummary) -> pd.DataFrame:
+    """Cast a chunk read with ``read_kinds`` to the stored dtypes: dates parsed, numbers and text narrowed."""
+    kinds = summary.storage_kinds()
+    read_kinds = summary.read_kinds()
+    for name, dtype in summary.storage_dtypes().items():
+        if read_kinds[name] == "string" and kinds[name] == "datetime":
+            chunk[name] = parse_dates(chunk[name], summary.columns[name].date_format)
+        elif kinds[name] != "datetime" and str(dtype) != PANDAS_DTYPES[kinds[name]]:
+            chunk[name] = chunk[name].astype(dtype)
+    return chunk
+
+
+def _count_bytes(report: Dict[str, Dict[str, Any]], before: pd.Series, after: pd.Series) -> None:
+    for name, entry in report.items():
+        entry["bytes_before"] += int(before[name])
+        entry["bytes_after"] += int(after[name])
+        entry["bytes_saved"] = entry["bytes_before"] - entry["bytes_after"]
+
+
+def write_parquet(sources: Sources, parquet_path: Path, summary: DatasetSummary,
+                  sample: Optional[ReservoirSample] = None, sketches: Optional[DatasetSketches] = None, rollups: Optional[TimeRollups] = None,
+                  correlations: Optional[CorrelationMatrix] = None, engine: str = CSV_ENGINE,
+                  spill: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Second pass: convert the sources to Parquet one chunk at a time, casting every chunk
+    to the dtypes settled by the first pass so all row groups share one schema. The
+    batches the first pass spilled are read instead of the sources when they fit.
+    Typed chunks are also fed to the reservoir sample, the sketches, the time rollups
+    and the correlation matrix, if given.
+    Returns the per-column memory report of the downcast.
+    """
+    read_kinds = summary.read_kinds()
+    schema = summary.arrow_schema()
+    report = {name: {"from": PANDAS_DTYPES[read_kinds[name]], "to": str(dtype), "bytes_before": 0, "bytes_after": 0, "bytes_saved": 0}
+              for name, dtype in summary.storage_dtypes().items()}
+    tmp_path = parquet_path.with_name(f"{parquet_path.name}.tmp-{os.getpid()}")
+    try:
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            use_spill = spill is not None and spill.exists() and spill_fits(spill, read_kinds)
+            chunks = read_spilled(spill, read_kinds) if use_spill else iter_sources(sources, read_kinds, engine)
+            for chunk in chunks:
+                before = chunk.memory_usage(index=False, deep=True)
+                chunk = cast_storage(chunk, summary)
+                _count_bytes(report, before, chunk.memory_usage(index=False, deep=True))
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                if sample is not None:
+                    sample.update(chunk)
+                if sketches is not None:
+                    sketches.update(chunk)
+                if rollups is not None:
+                    rollups.update(chunk)
+                if correlations is not None:
+                    correlations.update(chunk)
+        os.replace(tmp_path, parquet_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return report
+
+
+def write_frame(df: pd.DataFrame, path: Path, schema: Optional[pa.Schema] = None, index: bool = False) -> None:
+    """Write a small derived frame to Parquet atomically (with its index if ``index``)."""
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        df.to_parquet(tmp_path, index=index, schema=schema)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_json(data: Dict[str, Any], path: Path) -> None:
+    """Write a JSON sidecar atomically; values JSON cannot represent (timestamps) are stringified."""
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_summary(summary: DatasetSummary, path: Path) -> None:
+    """Persist the mergeable summary atomically, so appended rows can be folded into it later."""
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(summary, f)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def read_summary(path: Path) -> DatasetSummary:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def column_quantiles(parquet_paths: List[Path], columns: List[str]) -> Dict[str, List[Optional[float]]]:
+    """Exact ``PROFILE_QUANTILES`` from the columnar store (all of its parts), in bounded memory."""
+    return {name: chunked_quantiles(parquet_paths, name, PROFILE_QUANTILES) for name in columns}
+
+
+def _numeric_columns(summary: DatasetSummary) -> List[str]:
+    return [name for name, kind in summary.storage_kinds().items() if kind in ("int", "float")]
+
+
+def convert_source(sources: Sources, artifact_path: Callable[[str], Path],
+                   source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Convert the stored sources of a dataset (the upload in any accepted format, then any
+    appended JSON Lines) into the columnar store in bounded memory and return its profile.
+    ``artifact_path`` maps an artifact suffix (``parquet``, ``sample.parquet``,
+    ``profile.json``, ...) to where it is stored; ``source`` (upload size and hash) is
+    recorded in the profile together with the format of the upload.
+    """
+    # Parsed CSV batches are kept for the second pass instead of parsing the text twice
+    spill = artifact_path("parquet").with_name(f"{artifact_path('parquet').name}.spill-{os.getpid()}")
+    try:
+        summary, engine = summarize_source(sources, spill)
+        sample = ReservoirSample(strata_col=summary.strata_col() if SAMPLE_STRATIFY else None)
+        evidence = profile_columns(summary)
+        roles = role_index(evidence)
+        columns = insight_roles(roles)
+        sketches = DatasetSketches.for_frame(summary.empty_frame(), columns)
+        rollups = TimeRollups.for_roles(roles, evidence)
+        correlations = CorrelationMatrix(correlation_columns(roles, evidence))
+        dtype_report = write_parquet(sources, artifact_path("parquet"), summary, sample, sketches,
+                                     rollups, correlations, engine, spill)
+    finally:
+        spill.unlink(missing_ok=True)
+    # Aggregated from the written store, partitioned by row groups across the analysis workers
+    aggregates = parquet_aggregates([artifact_path("parquet")], columns)
+    write_frame(sample.result(), artifact_path("sample.parquet"), index=True)
+    aggregates.write_distinct(artifact_path)
+    write_json(aggregates.to_dict(), artifact_path("aggregates.json"))
+    write_json(sketches.to_dict(), artifact_path("sketches.json"))
+    write_json(correlations.to_dict(), artifact_path("correlations.json"))
+    if rollups is not None:
+        write_frame(rollups.to_frame(), artifact_path("rollups.parquet"))
+    else:
+        artifact_path("rollups.parquet").unlink(missing_ok=True)
+    write_summary(summary, artifact_path("summary.pkl"))
+    profile = build_profile(summary, column_quantiles([artifact_path("parquet")], _numeric_columns(summary)),
+                            dtype_report, {**(source or {}), "format": sources[0][1]})
+    write_json(profile, artifact_path("profile.json"))
+    return profile
+
+
+def merge_sample(sample: pd.DataFrame, seen: int, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extend a uniform sample of ``seen`` rows with new rows. How many of the new rows
+    enter is drawn from the hypergeometric distribution, so the result is again a
+    uniform sample without replacement of all rows (strata are not rebalanced). The
+    new rows are indexed by their positions in the dataset, following the ``seen`` rows.
+    """
+    rows = rows.set_axis(pd.RangeIndex(seen, seen + len(rows)))
+    if seen + len(rows) > SAMPLE_ROWS:
+        rng = np.random.default_rng([SAMPLE_SEED, seen])
+        taken = rng.hypergeometric(len(rows), seen, SAMPLE_ROWS)
+        keep = np.sort(rng.choice(len(sample), min(len(sample), SAMPLE_ROWS - taken), replace=False))
+        sample, rows = sample.iloc[keep], rows.iloc[np.sort(rng.choice(len(rows), taken, replace=False))]
+    # Concatenating an empty frame (the sample of a header-only upload) is deprecated
+    return pd.concat([frame for frame in (sample, rows) if len(frame)] or [rows])
+
+
+def append_source(delta_path: Path, part_path: Path, artifact_path: Callable[[str], Path],
+                  source: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Fold rows appended as JSON Lines into a converted dataset, in time proportional to
+    them: the persisted summary, sample, insight aggregates, sketches, time rollups and
+    correlation matrix are merged with the new rows, which are stored as one more
+    Parquet part (``part_path``). The medians and quantiles in the profile come from the updated
+    t-digests from then on, so they are estimates once rows have been appended.
+    ``source`` replaces the upload details recorded in the profile.
+    Returns the new profile, or None when the rows change the stored type of a column or
+    which column plays an insight role, in which case the dataset has to be converted
+    again from all of its sources.
+    """
+    summary = read_summary(artifact_path("summary.pkl"))
+    kinds, dtypes = summary.storage_kinds(), {name: str(d) for name, d in summary.storage_dtypes().items()}
+    date_formats = {name: col.date_format for name, col in summary.columns.items()}
+    rows = pd.concat(list(iter_chunks(delta_path, "jsonl")), ignore_index=True)
+    seen = summary.num_rows
+    summary.merge(DatasetSummary.from_frame(rows, date_formats))
+    if summary.storage_kinds() != kinds or {name: str(d) for name, d in summary.storage_dtypes().items()} != dtypes:
+        return None
+    with open(artifact_path("profile.json")) as f:
+        previous = json.load(f)
+    # Aggregates and sketches are kept per insight column; rows that move a role to another column need them rebuilt
+    roles = previous.get("semantic_roles")
+    if roles is None or insight_roles(role_index(profile_columns(summary))) != insight_roles(roles):
+        return None
+
+    rows = cast_chunk(rows, summary.read_kinds())
+    before = rows.memory_usage(index=False, deep=True)
+    rows = cast_storage(rows, summary)
+    write_frame(rows, part_path, summary.arrow_schema())
+
+    dtype_report = previous["dtype_report"]
+    _count_bytes(dtype_report, before, rows.memory_usage(index=False, deep=True))
+    sample = pd.read_parquet(artifact_path("sample.parquet"))
+    write_frame(merge_sample(sample, seen, rows), artifact_path("sample.parquet"), index=True)
+    with open(artifact_path("aggregates.json")) as f:
+        aggregates = InsightAggregates.from_dict(json.load(f))
+    aggregates.update(rows)
+    aggregates.append_distinct(rows, artifact_path)
+    write_json(aggregates.to_dict(), artifact_path("aggregates.json"))
+    with open(artifact_path("sketches.json")) as f:
+        sketches = DatasetSketches.from_dict(json.load(f))
+    sketches.update(rows)
+    write_json(sketches.to_dict(), artifact_path("sketches.json"))
+    with open(artifact_path("correlations.json")) as f:
+        correlations = CorrelationMatrix.from_dict(json.load(f))
+    correlations.update(rows)
+    write_json(correlations.to_dict(), artifact_path("correlations.json"))
+    if roles["date"] is not None:
+        rollups = TimeRollups.from_frame(pd.read_parquet(artifact_path("rollups.parquet")), roles["date"])
+        rollups.update(rows)
+        write_frame(rollups.to_frame(), artifact_path("rollups.parquet"))
+    write_summary(summary, artifact_path("summary.pkl"))
+    # Medians and quantiles are t-digest estimates from here on; the profile keeps their rank error
+    digests = {name: sketches.quantiles[name] for name in _numeric_columns(summary)}
+    quantiles = {name: [digest.quantile(q) for q in PROFILE_QUANTILES] for name, digest in digests.items()}
+    rank_errors = {name: [digest.rank_error(q) for q in PROFILE_QUANTILES] for name, digest in digests.items()}
+    profile = build_profile(summary, quantiles, dtype_report, source or previous["source"], rank_errors)
+    write_json(profile, artifact_path("profile.json"))
+    return profile
@@ -0,0 +1,238 @@
+# backend/app/insight_aggregates.py
+# Mergeable partial aggregates behind the business insights of DataInsightsEngine
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from app.sketches import hash_values
+
+# Appends each store their new distinct values as one more run; past this many runs the appended ones are merged
+MAX_DISTINCT_RUNS = 8
+
+
+def _distinct_hashes(values: pd.Series) -> np.ndarray:
+    return np.unique(hash_values(values))
+
+
+def _contains(run: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Which of ``hashes`` are in the sorted ``run``, by binary search (so a memory-mapped run is barely read)."""
+    if not len(run):
+        return np.zeros(len(hashes), dtype=bool)
+    index = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+    return run[index] == hashes
+
+
+def _write_run(hashes: np.ndarray, path: Path) -> None:
+    tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.save(f, hashes)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class InsightAggregates:
+    """
+    Everything the five business insights need, kept as aggregates that merge by
+    addition: row count, revenue sum and count, per-group sums of the sales column for
+    the category and geography columns, status counts and the distinct customers.
+    Built chunk by chunk at ingest and updated with only the appended rows afterwards.
+
+    Distinct customers are held as sorted 64-bit hashes while aggregating and are then
+    stored beside the JSON as sorted runs (``write_distinct``), of which only the count
+    is loaded; an append looks its customers up in the memory-mapped runs and stores
+    the new ones as one more run (``append_distinct``), in time proportional to the
+    appended rows.
+    """
+
+    def __init__(self, columns: Dict[str, Optional[str]]):
+        # Insight role -> column, as found by ``column_roles.insight_roles``
+        self.columns = columns
+        self.rows = 0
+        self.revenue_sum = 0.0
+        self.revenue_count = 0
+        self.sums: Dict[str, Dict[Any, float]] = {}
+        self.counts: Dict[str, Dict[Any, int]] = {}
+        # Column -> sorted hashes of its distinct values, until they are written out
+        self.distinct: Dict[str, np.ndarray] = {}
+        # Column -> distinct count and artifact names of its stored runs
+        self.distinct_counts: Dict[str, int] = {}
+        self.distinct_runs: Dict[str, List[str]] = {}
+        self.next_run = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Dict[str, Optional[str]]) -> "InsightAggregates":
+        agg = cls(columns)
+        agg.rows = len(df)
+        revenue, sales = columns['revenue'], columns['sales']
+        if revenue:
+            agg.revenue_sum = float(df[revenue].sum())
+            agg.revenue_count = int(df[revenue].count())
+        if sales:
+            for role in ('category', 'geography'):
+                col = columns[role]
+                if col and col not in agg.sums:
+                    agg.sums[col] = df.groupby(col, observed=True)[sales].sum().to_dict()
+        if columns['status']:
+            agg.counts[columns['status']] = df[columns['status']].value_counts().to_dict()
+        if columns['customer']:
+            agg.distinct[columns['customer']] = _distinct_hashes(df[columns['customer']])
+        return agg
+
+    @classmethod
+    def from_table(cls, table: pa.Table, columns: Dict[str, Optional[str]]) -> "InsightAggregates":
+        """
+        Same as ``from_frame`` for an Arrow table, computed with Arrow kernels, which
+        run without holding the GIL so partitions can be aggregated on threads.
+        """
+        agg = cls(columns)
+        agg.rows = table.num_rows
+        revenue, sales = columns['revenue'], columns['sales']
+        if revenue:
+            agg.revenue_sum = float(pc.sum(table[revenue], min_count=0).as_py())
+            agg.revenue_count = pc.count(table[revenue]).as_py()
+        if sales:
+            for role in ('category', 'geography'):
+                col = columns[role]
+                if col and col not in agg.sums:
+                    grouped = (table.select([col, sales]).filter(pc.is_valid(table[col]))
+                               .group_by(col).aggregate([(sales, 'sum', pc.ScalarAggregateOptions(min_count=0))]))
+                    agg.sums[col] = dict(zip(grouped[col].to_pylist(), grouped[f'{sales}_sum'].to_pylist()))
+        if columns['status']:
+            counts = pc.value_counts(table[columns['status']])
+            agg.counts[columns['status']] = {key: count for key, count in zip(counts.field('values').to_pylist(),
+                                                                           counts.field('counts').to_pylist())
+                                             if key is not None}
+        if columns['customer']:
+            values = pc.unique(table[columns['customer']]).drop_null()
+            agg.distinct[columns['customer']] = _distinct_hashes(values.to_pandas())
+        return agg
+
+    def merge(self, other: "InsightAggregates") -> None:
+        """Fold the aggregates of more rows into these."""
+        self.rows += other.rows
+        self.revenue_sum += other.revenue_sum
+        self.revenue_count += other.revenue_count
+        for col, sums in other.sums.items():
+            target = self.sums.setdefault(col, {})
+            for key, value in sums.items():
+                target[key] = target.get(key, 0) + value
+        for col, counts in other.counts.items():
+            target = self.counts.setdefault(col, {})
+            for key, value in counts.items():
+                target[key] = target.get(key, 0) + value
+        for col, hashes in other.distinct.items():
+            if col in self.distinct_runs:
+                continue  # stored on disk: ``append_distinct`` counts the new values
+            self.distinct[col] = np.union1d(self.distinct[col], hashes) if col in self.distinct else hashes
+
+    def update(self, df: pd.DataFrame) -> None:
+        self.merge(InsightAggregates.from_frame(df, self.columns))
+
+    def scaled(self, rows: int) -> "InsightAggregates":
+        """
+        Estimates for a dataset of ``rows`` rows from these aggregates of a uniform sample
+        of it: sums and counts grow by ``rows / self.rows``. Distinct values stay the ones
+        seen in the sample.
+        """
+        factor = rows / self.rows if self.rows else 0.0
+        agg = InsightAggregates(self.columns)
+        agg.rows = rows
+        agg.revenue_sum = self.revenue_sum * factor
+        agg.revenue_count = int(round(self.revenue_count * factor))
+        agg.sums = {col: {key: value * factor for key, value in sums.items()} for col, sums in self.sums.items()}
+        agg.counts = {col: {key: int(round(value * factor)) for key, value in counts.items()}
+                      for col, counts in self.counts.items()}
+        agg.distinct = self.distinct
+        agg.distinct_counts = self.distinct_counts
+        return agg
+
+    @property
+    def revenue_mean(self) -> float:
+        return self.revenue_sum / self.revenue_count if self.revenue_count else float('nan')
+
+    @staticmethod
+    def _series(mapping: Dict[Any, Any]) -> pd.Series:
+        series = pd.Series(mapping, dtype=float if not mapping else None)
+        try:
+            return series.sort_index()  # the key order groupby would produce
+        except TypeError:
+            return series
+
+    def group_sums(self, col: str) -> pd.Series:
+        return self._series(self.sums.get(col, {}))
+
+    def value_counts(self, col: str) -> pd.Series:
+        return self._series(self.counts.get(col, {})).sort_values(ascending=False)
+
+    def nunique(self, col: str) -> int:
+        if col in self.distinct:
+            return len(self.distinct[col])
+        return self.distinct_counts.get(col, 0)
+
+    def write_distinct(self, artifact_path: Callable[[str], Path]) -> None:
+        """Store the distinct hashes held in memory as one run per column and keep only their counts."""
+        if self.columns['customer']:
+            self.distinct.setdefault(self.columns['customer'], np.empty(0, dtype=np.uint64))
+        for col, hashes in self.distinct.items():
+            name = f"distinct-{self.next_run}.npy"
+            self.next_run += 1
+            _write_run(hashes, artifact_path(name))
+            self.distinct_counts[col] = len(hashes)
+            self.distinct_runs[col] = [name]
+        self.distinct = {}
+
+    def append_distinct(self, df: pd.DataFrame, artifact_path: Callable[[str], Path]) -> None:
+        """
+        Count the distinct values of appended rows not seen before and store them as a new
+        run. Stored runs are never modified, so datasets sharing them by hard link stay
+        intact; once a column has more than ``MAX_DISTINCT_RUNS`` runs, those added by
+        appends are merged into one (the run written at ingest is left alone).
+        """
+        for col, runs in self.distinct_runs.items():
+            hashes = _distinct_hashes(df[col])
+            for name in runs:
+                hashes = hashes[~_contains(np.load(artifact_path(name), mmap_mode="r"), hashes)]
+            if not len(hashes):
+                continue
+            self.distinct_counts[col] += len(hashes)
+            merged = runs[1:] if len(runs) >= MAX_DISTINCT_RUNS else []
+            if merged:
+                hashes = np.concatenate([np.load(artifact_path(name)) for name in merged] + [hashes])
+            name = f"distinct-{self.next_run}.npy"
+            self.next_run += 1
+            _write_run(np.sort(hashes), artifact_path(name))
+            self.distinct_runs[col] = [run for run in runs if run not in merged] + [name]
+            for run in merged:
+                artifact_path(run).unlink(missing_ok=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready form; keys are kept as ``[key, value]`` pairs so their types survive."""
+        return {
+            'columns': self.columns,
+            'rows': self.rows,
+            'revenue_sum': self.revenue_sum,
+            'revenue_count': self.revenue_count,
+            'sums': {col: list(map(list, sums.items())) for col, sums in self.sums.items()},
+            'counts': {col: list(map(list, counts.items())) for col, counts in self.counts.items()},
+            'distinct': {col: self.nunique(col) for col in {*self.distinct, *self.distinct_counts}},
+            'distinct_runs': self.distinct_runs,
+            'next_run': self.next_run
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InsightAggregates":
+        agg = cls(data['columns'])
+        agg.rows = data['rows']
+        agg.revenue_sum = data['revenue_sum']
+        agg.revenue_count = data['revenue_count']
+        agg.sums = {col: {key: value for key, value in pairs} for col, pairs in data['sums'].items()}
+        agg.counts = {col: {key: value for key, value in pairs} for col, pairs in data['counts'].items()}
+        agg.distinct_counts = data['distinct']
+        agg.distinct_runs = data['distinct_runs']
+        agg.next_run = data['next_run']
+        return agg
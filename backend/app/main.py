@@ -1,19 +1,22 @@
 # backend/app/main.py
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.vibe_engine import vibe_code, get_constraints, sample_data_for_vibe
-from app.data_utils import infer_schema_from_df, load_csv
-from app.schemas import RecommendRequest, RecommendResponse, UploadResponse, PreviewRequest, PreviewResponse
-from app.chart_generator import generate_plotly_spec
+from app.data_utils import dataset_exists, resolve_dataset, source_paths, get_catalog, upload_staging_path, register_upload, append_rows, export_csv, load_dataset, load_sample, load_schema, load_profile, load_analysis, cached_analysis, load_sample_analysis, load_rollups, load_correlations, delete_dataset
+from app.dataset_profile import upload_summary
+from app.dataset_cache import get_dataset_cache
+from app.ingest import stream_upload
+from app.readers import SOURCE_FORMATS, MEDIA_TYPES, detect_format
+from app.retention import get_retention_sweeper
+from app.schemas import RecommendRequest, RecommendResponse, UploadResponse, AppendRequest, AppendResponse, PreviewRequest, PreviewResponse
+from app.chart_generator import generate_plotly_spec, chart_columns, rollup_chart_frame
 from app.ml_vibe_engine import get_ml_engine
-from app.data_insights import DataInsightsEngine
 from app.ai_storyteller import get_storyteller
 from app.data_qa import create_qa_engine
-import uuid
-import os
-import pandas as pd
-from pathlib import Path
+import json
+from typing import Iterator
 from pydantic import BaseModel
 
 app = FastAPI(title="Vibe-Code API", version="1.0.0")
@@ -27,9 +30,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Data directory
-DATA_DIR = Path(__file__).parent.parent / "data"
-DATA_DIR.mkdir(exist_ok=True)
+@app.on_event("startup")
+async def start_retention_sweeper():
+    get_retention_sweeper().start()
+
+@app.on_event("shutdown")
+async def stop_retention_sweeper():
+    get_retention_sweeper().stop()
 
 @app.get("/")
 async def root():
@@ -69,21 +76,30 @@ async def recommend(req: RecommendRequest):
         # Load file data if provided
         dataset_features = None
         df = None
+        roles = None
+        correlations = None
         if req.file_id:
-            file_path = DATA_DIR / f"{req.file_id}.csv"
-            if file_path.exists():
-                df = pd.read_csv(file_path)
-                # Sample if too large
-                if len(df) > 5000:
-                    df = df.sample(n=5000, random_state=42)
-                dataset_features = infer_schema_from_df(df)
+            if dataset_exists(req.file_id):
+                # Features come from the persisted profile; only the charted columns are loaded,
+                # from the upload-time sample unless exact full-data results are requested
+                profile = await run_in_threadpool(load_profile, req.file_id)
+                dataset_features, roles = profile["schema"], profile["semantic_roles"]
+                schema = load_schema(req.file_id)
+                # Trends over the date column are drawn from the time rollups of all rows
+                df = rollup_chart_frame(vibe, schema, load_rollups(req.file_id) if vibe == "line" else None, roles=roles)
+                if df is None:
+                    # Scatter plots pair the most correlated columns of all rows
+                    correlations = load_correlations(req.file_id) if vibe == "scatter" else None
+                    columns = chart_columns(vibe, schema, roles=roles, correlations=correlations)
+                    load = load_dataset if req.full_data else load_sample
+                    df = await run_in_threadpool(load, req.file_id, columns=columns)
         
         # Get constraints
         constraints = get_constraints(vibe, dataset_features)
         
         # Generate sample chart spec
         if df is not None:
-            chart_spec = generate_plotly_spec(vibe, df)
+            chart_spec = generate_plotly_spec(vibe, df, roles=roles, correlations=correlations)
         else:
             # Use synthetic sample data
             sample_df = sample_data_for_vibe(vibe)
@@ -102,42 +118,38 @@ async def recommend(req: RecommendRequest):
 @app.post("/api/upload", response_model=UploadResponse)
 async def upload_file(file: UploadFile = File(...)):
     """
-    Upload a CSV file and return dataset summary.
+    Upload a CSV, gzip CSV, Parquet or JSON Lines file and return dataset summary.
     """
     try:
         # Validate file type
-        if not file.filename.endswith(".csv"):
-            raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-        
-        # Generate unique file ID
-        file_id = str(uuid.uuid4())
-        file_path = DATA_DIR / f"{file_id}.csv"
+        fmt = detect_format(file.filename)
+        if fmt is None:
+            accepted = ", ".join(s for suffixes in SOURCE_FORMATS.values() for s in suffixes)
+            raise HTTPException(status_code=400, detail=f"Unsupported file type; accepted: {accepted}")
         
-        # Save file
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        # Stream to disk, hashing as chunks arrive
+        staged = upload_staging_path()
+        size_bytes, content_hash = await stream_upload(file, staged)
         
-        # Analyze file
-        df = pd.read_csv(file_path)
-        summary = infer_schema_from_df(df)
-        
-        # Add column info
-        summary["columns"] = [
-            {
-                "name": col,
-                "dtype": str(df[col].dtype),
-                "sample_values": df[col].head(3).tolist()
-            }
-            for col in df.columns
-        ]
+        # Store once per distinct content under a new file ID; only new content is
+        # converted to the columnar store, re-uploads reuse the existing profile.
+        # Converting is CPU-bound, so it runs on the threadpool instead of the event loop
+        file_id, profile, deduplicated = await run_in_threadpool(
+            register_upload, staged, fmt, size_bytes, content_hash, file.filename)
+        summary = upload_summary(profile)
         
         return UploadResponse(
             file_id=file_id,
             filename=file.filename,
-            summary=summary
+            summary=summary,
+            deduplicated=deduplicated
         )
     
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # The file does not parse as the format its name says
+        raise HTTPException(status_code=400, detail=f"Upload failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -148,14 +160,22 @@ async def preview_chart(req: PreviewRequest):
     """
     try:
         # Load data
+        roles = None
+        correlations = None
         if req.file_id:
-            file_path = DATA_DIR / f"{req.file_id}.csv"
-            if not file_path.exists():
+            if not dataset_exists(req.file_id):
                 raise HTTPException(status_code=404, detail="File not found")
-            df = pd.read_csv(file_path)
-            # Sample if large
-            if len(df) > 5000:
-                df = df.sample(n=5000, random_state=42)
+            # Load only the charted columns, from the upload-time sample unless
+            # exact full-data results are requested
+            roles = (await run_in_threadpool(load_profile, req.file_id))["semantic_roles"]
+            schema = load_schema(req.file_id)
+            rollups = load_rollups(req.file_id) if req.vibe == "line" else None
+            df = rollup_chart_frame(req.vibe, schema, rollups, req.x_col, req.y_col, roles)
+            if df is None:
+                correlations = load_correlations(req.file_id) if req.vibe == "scatter" else None
+                columns = chart_columns(req.vibe, schema, req.x_col, req.y_col, req.group_col, roles, correlations)
+                load = load_dataset if req.full_data else load_sample
+                df = await run_in_threadpool(load, req.file_id, columns=columns)
         else:
             # Use sample data
             df = sample_data_for_vibe(req.vibe)
@@ -166,7 +186,9 @@ async def preview_chart(req: PreviewRequest):
             df,
             x_col=req.x_col,
             y_col=req.y_col,
-            group_col=req.group_col
+            group_col=req.group_col,
+            roles=roles,
+            correlations=correlations
         )
         
         return PreviewResponse(
@@ -177,19 +199,53 @@ async def preview_chart(req: PreviewRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/files")
+async def list_files(limit: int = 50, offset: int = 0):
+    """
+    List uploads from the catalog, newest first, with their original filename,
+    size, format, content hash, shape and columns.
+    """
+    limit = max(1, min(limit, 500))
+    offset = max(0, offset)
+    files, total = get_catalog().list_files(limit, offset)
+    return {"files": files, "total": total, "limit": limit, "offset": offset}
+
+@app.post("/api/files/{file_id}/append", response_model=AppendResponse)
+async def append_to_file(file_id: str, req: AppendRequest):
+    """
+    Append rows to an upload. Statistics and insight aggregates are updated from
+    the new rows only; returns the updated upload summary.
+    """
+    if not dataset_exists(file_id):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        profile = await run_in_threadpool(append_rows, file_id, req.rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AppendResponse(file_id=file_id, appended=len(req.rows), summary=upload_summary(profile))
+
 @app.get("/api/files/{file_id}")
 async def download_file(file_id: str):
     """
     Download a previously uploaded file.
     """
-    file_path = DATA_DIR / f"{file_id}.csv"
-    if not file_path.exists():
+    dataset_id = resolve_dataset(file_id) if dataset_exists(file_id) else None
+    sources = source_paths(dataset_id) if dataset_id else []
+    if not sources:
         raise HTTPException(status_code=404, detail="File not found")
+    if len(sources) > 1:
+        # Rows were appended after upload: export everything as CSV
+        return StreamingResponse(
+            export_csv(dataset_id),
+            media_type=MEDIA_TYPES["csv"],
+            headers={"Content-Disposition": f'attachment; filename="data_{file_id}.csv"'}
+        )
+    file_path, fmt = sources[0]
     
     return FileResponse(
         file_path,
-        media_type="text/csv",
-        filename=f"data_{file_id}.csv"
+        media_type=MEDIA_TYPES[fmt],
+        filename=f"data_{file_id}.{fmt}"
     )
 
 @app.delete("/api/files/{file_id}")
@@ -197,12 +253,17 @@ async def delete_file(file_id: str):
     """
     Delete an uploaded file.
     """
-    file_path = DATA_DIR / f"{file_id}.csv"
-    if file_path.exists():
-        os.remove(file_path)
+    if delete_dataset(file_id):
         return {"message": "File deleted successfully"}
     raise HTTPException(status_code=404, detail="File not found")
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss/eviction counters of the in-process dataset cache, for sizing DATASET_CACHE_MB.
+    """
+    return get_dataset_cache().stats()
+
 @app.post("/api/feedback")
 async def submit_feedback(prompt: str, predicted_vibe: str, correct_vibe: str):
     """
@@ -245,71 +306,117 @@ async def retrain_model():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ai_story(file_id: str, insights: list) -> dict:
+    """AI narrative and follow-up questions for the insights of an upload (empty without a storyteller)."""
+    storyteller = get_storyteller()
+    ai_story = None
+    ai_suggestions = []
+    
+    if storyteller:
+        try:
+            # Create data summary for AI
+            columns = list(load_schema(file_id).columns)
+            data_summary = {
+                'total_rows': load_profile(file_id)['num_rows'],
+                'total_columns': len(columns),
+                'columns': columns
+            }
+            
+            # Generate compelling narrative
+            ai_story = storyteller.generate_story(
+                insights, 
+                data_summary
+            )
+            
+            # Get AI-powered suggestions
+            ai_suggestions = storyteller.suggest_next_analysis(
+                insights,
+                data_summary.get('type', 'bar')
+            )
+            
+        except Exception as e:
+            print(f"AI storytelling failed: {e}")
+            # Continue without AI features
+    return {"ai_story": ai_story, "ai_suggestions": ai_suggestions}
+
+def _insights_response(file_id: str, analysis: dict, approximate: bool) -> dict:
+    response = {
+        "file_id": file_id,
+        "insights": analysis['insights'],
+        "recommendations": analysis['recommendations'],
+        "auto_charts": analysis['auto_charts'],
+        "statistics": analysis['statistics'],
+        "timings": analysis['timings'],
+        # Appended datasets carry estimated quantiles (and their error bounds) in the exact mode too
+        "approximate": approximate or 'error_bounds' in analysis
+    }
+    if 'error_bounds' in analysis:
+        response["error_bounds"] = analysis['error_bounds']
+    if 'sample_rows' in analysis:
+        response["sample_rows"] = analysis['sample_rows']
+    return response
+
 @app.get("/api/insights/{file_id}")
-async def get_insights(file_id: str):
+async def get_insights(file_id: str, approximate: bool = False):
     """
     Generate automatic business insights from uploaded data.
-    Returns 5 key insights, recommendations, and suggested visualizations.
+    Returns up to 8 key insights, recommendations, and suggested visualizations.
     NOW WITH AI-POWERED STORYTELLING!
+    With ``approximate=true`` distinct counts, top groups and quantiles come from the
+    dataset's sketches and the response carries their error bounds.
     """
     try:
-        file_path = DATA_DIR / f"{file_id}.csv"
-        if not file_path.exists():
+        if not dataset_exists(file_id):
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Load data
-        df = pd.read_csv(file_path)
-        
-        # Generate insights
-        engine = DataInsightsEngine(df)
-        analysis = engine.analyze()
-        
-        # Generate AI story from insights
-        storyteller = get_storyteller()
-        ai_story = None
-        ai_suggestions = []
+        # Insights come from aggregates persisted at ingest and are cached with the dataset;
+        # loading them (and the AI call) blocks, so it runs on the threadpool
+        analysis = await run_in_threadpool(load_analysis, file_id, approximate)
         
-        if storyteller:
-            try:
-                # Create data summary for AI
-                data_summary = {
-                    'total_rows': len(df),
-                    'total_columns': len(df.columns),
-                    'columns': list(df.columns)
-                }
-                
-                # Generate compelling narrative
-                ai_story = storyteller.generate_story(
-                    analysis['insights'], 
-                    data_summary
-                )
-                
-                # Get AI-powered suggestions
-                ai_suggestions = storyteller.suggest_next_analysis(
-                    analysis['insights'],
-                    data_summary.get('type', 'bar')
-                )
-                
-            except Exception as e:
-                print(f"AI storytelling failed: {e}")
-                # Continue without AI features
-        
-        return {
-            "file_id": file_id,
-            "insights": analysis['insights'],
-            "recommendations": analysis['recommendations'],
-            "auto_charts": analysis['auto_charts'],
-            "statistics": analysis['statistics'],
-            "ai_story": ai_story,  # NEW: AI-generated narrative
-            "ai_suggestions": ai_suggestions  # NEW: Smart follow-up questions
-        }
+        response = _insights_response(file_id, analysis, approximate)
+        # NEW: AI-generated narrative and smart follow-up questions
+        response.update(await run_in_threadpool(_ai_story, file_id, analysis['insights']))
+        return response
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Insights generation failed: {str(e)}")
 
-# Q&A Request Model
-from pydantic import BaseModel
+def _sse(event: str, data: dict) -> str:
+    """One server-sent event; values JSON cannot represent (timestamps) are stringified."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _insight_events(file_id: str) -> Iterator[str]:
+    """
+    Events of a streamed analysis: the sample-based insights unless the exact analysis is
+    already cached, then the exact insights, then the AI story. A failure ends the stream
+    with an ``error`` event.
+    """
+    try:
+        analysis = cached_analysis(file_id)
+        if analysis is None:
+            yield _sse("insights", _insights_response(file_id, load_sample_analysis(file_id), True))
+            analysis = load_analysis(file_id)
+        yield _sse("insights", _insights_response(file_id, analysis, False))
+        yield _sse("story", {"file_id": file_id, **_ai_story(file_id, analysis['insights'])})
+        yield _sse("done", {"file_id": file_id})
+    except Exception as e:
+        yield _sse("error", {"detail": f"Insights generation failed: {str(e)}"})
+
+@app.get("/api/insights/{file_id}/stream")
+async def stream_insights(file_id: str):
+    """
+    The insights of ``/api/insights`` as server-sent events, so the first ones arrive
+    before the full-data analysis is done: an approximate answer from the persisted
+    sample (``"approximate": true``), then the exact one, then the AI story.
+    """
+    if not dataset_exists(file_id):
+        raise HTTPException(status_code=404, detail="File not found")
+    # The generator is synchronous, so Starlette runs each step (the sample and exact
+    # analyses, the AI story) on the threadpool between events
+    return StreamingResponse(_insight_events(file_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
+# Q&A Request Model
 class QuestionRequest(BaseModel):
     file_id: str
     question: str
@@ -325,22 +432,19 @@ async def ask_question(req: QuestionRequest):
     - "What's the average order value?"
     """
     try:
-        file_path = DATA_DIR / f"{req.file_id}.csv"
-        if not file_path.exists():
+        if not dataset_exists(req.file_id):
             raise HTTPException(status_code=404, detail="File not found")
         
-        # Load data
-        df = pd.read_csv(file_path)
-        
-        # Get cached insights if available
-        insights_engine = DataInsightsEngine(df)
-        analysis = insights_engine.analyze()
+        # Only the schema is loaded: insights come from the cache shared with /api/insights
+        df = await run_in_threadpool(load_schema, req.file_id)
+        profile = await run_in_threadpool(load_profile, req.file_id)
+        analysis = await run_in_threadpool(load_analysis, req.file_id)
         
         # Create Q&A engine
-        qa_engine = create_qa_engine(df, req.file_id)
+        qa_engine = create_qa_engine(df, req.file_id, profile['num_rows'], profile['semantic_roles'])
         
-        # Answer the question
-        result = qa_engine.ask(req.question, analysis['insights'])
+        # Answer the question (the AI call blocks too)
+        result = await run_in_threadpool(qa_engine.ask, req.question, analysis['insights'])
         
         return {
             "question": req.question,
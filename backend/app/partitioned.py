@@ -0,0 +1,83 @@
+# backend/app/partitioned.py
+# Multi-core partitioned aggregation of the insight aggregates
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.chunked_analysis import ANALYSIS_MEMORY_BYTES, batch_rows
+from app.insight_aggregates import InsightAggregates
+
+# Threads aggregating partitions at once; Arrow kernels release the GIL, so they run on separate cores
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", os.cpu_count() or 1))
+# Frames smaller than this are aggregated in one piece
+MIN_PARTITION_ROWS = 100_000
+
+
+def _wanted(columns: Dict[str, Optional[str]]) -> List[str]:
+    return sorted({col for col in columns.values() if col})
+
+
+def aggregate_partitions(partitions: List[Callable[[], pa.Table]], columns: Dict[str, Optional[str]],
+                         workers: int = ANALYSIS_WORKERS) -> InsightAggregates:
+    """
+    Aggregate each partition (a callable producing its rows) on a thread pool and merge
+    the results in partition order. Partitions are only materialized by the worker that
+    aggregates them, so at most ``workers`` are held in memory at once.
+    """
+    aggregates = InsightAggregates(columns)
+    if workers <= 1 or len(partitions) <= 1:
+        for partition in partitions:
+            aggregates.merge(InsightAggregates.from_table(partition(), columns))
+        return aggregates
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="aggregate") as pool:
+        for partial in pool.map(lambda partition: InsightAggregates.from_table(partition(), columns), partitions):
+            aggregates.merge(partial)
+    return aggregates
+
+
+def frame_aggregates(df: pd.DataFrame, columns: Dict[str, Optional[str]],
+                     workers: int = ANALYSIS_WORKERS) -> InsightAggregates:
+    """Insight aggregates of an in-memory frame, split into one row range per worker."""
+    try:
+        table = pa.Table.from_pandas(df[_wanted(columns)], preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns have no Arrow type; aggregate them with pandas
+        return InsightAggregates.from_frame(df, columns)
+    parts = max(1, min(workers, table.num_rows // MIN_PARTITION_ROWS))
+    bounds = np.linspace(0, table.num_rows, parts + 1).astype(int)
+    partitions = [lambda start=start, stop=stop: table.slice(start, stop - start)
+                  for start, stop in zip(bounds[:-1], bounds[1:])]
+    return aggregate_partitions(partitions, columns, workers)
+
+
+def _row_group_ranges(path: Path, max_rows: int) -> Iterator[List[int]]:
+    """Consecutive row groups of a Parquet file, grouped up to ``max_rows`` rows (at least one group each)."""
+    meta = pq.ParquetFile(path).metadata
+    groups, rows = [], 0
+    for g in range(meta.num_row_groups):
+        count = meta.row_group(g).num_rows
+        if groups and rows + count > max_rows:
+            yield groups
+            groups, rows = [], 0
+        groups.append(g)
+        rows += count
+    if groups:
+        yield groups
+
+
+def parquet_aggregates(paths: List[Path], columns: Dict[str, Optional[str]], workers: int = ANALYSIS_WORKERS,
+                       memory_bytes: int = ANALYSIS_MEMORY_BYTES) -> InsightAggregates:
+    """
+    Insight aggregates of a dataset stored as Parquet parts, reading only the insight
+    columns. Row groups are split into partitions sized so that ``workers`` of them fit
+    in ``memory_bytes`` together.
+    """
+    wanted = _wanted(columns)
+    max_rows = batch_rows(paths, wanted, memory_bytes // max(workers, 1))
+    partitions = [lambda path=path, groups=groups: pq.ParquetFile(path).read_row_groups(groups, columns=wanted)
+                  for path in paths for groups in _row_group_ranges(path, max_rows)]
+    return aggregate_partitions(partitions, columns, workers)
@@ -0,0 +1,213 @@
+# backend/app/readers.py
+# Chunked readers for every accepted upload format, all yielding pandas chunks
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", 100_000))
+# Bytes per block handed to the parallel CSV parser (each block becomes one chunk)
+CSV_BLOCK_BYTES = int(os.getenv("INGEST_CSV_BLOCK_MB", 4)) * 1024 * 1024
+# "arrow" parses CSV blocks in parallel on pyarrow's thread pool, "pandas" reads single-threaded
+CSV_ENGINE = os.getenv("INGEST_CSV_ENGINE", "arrow")
+
+# Stored format -> accepted filename suffixes (the first one is used for the stored raw file)
+SOURCE_FORMATS = {
+    "csv": (".csv",),
+    "csv.gz": (".csv.gz",),
+    "parquet": (".parquet", ".pq"),
+    "jsonl": (".jsonl", ".ndjson"),
+    "jsonl.gz": (".jsonl.gz", ".ndjson.gz"),
+}
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+    "jsonl": "application/x-ndjson",
+    "jsonl.gz": "application/gzip",
+}
+
+# Values pandas.read_csv reads as booleans, so both engines agree
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+
+ARROW_READ_TYPES = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "string": pa.string()}
+PANDAS_READ_DTYPES = {"int": "int64", "float": "float64", "bool": "bool", "string": "str"}
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Source format of an upload from its filename, or None when it is not accepted."""
+    name = filename.lower()
+    # Longest suffixes first so ``.csv.gz`` is not taken for something else
+    matches = [(len(s), fmt) for fmt, suffixes in SOURCE_FORMATS.items() for s in suffixes if name.endswith(s)]
+    return max(matches)[1] if matches else None
+
+
+def _scalar_text(value):
+    return json.dumps(value, default=str) if isinstance(value, (dict, list)) else value
+
+
+def _arrow_to_pandas(batch: pa.RecordBatch) -> pd.DataFrame:
+    """
+    Convert an Arrow batch to pandas with the types ingest understands: dates and
+    time-zone aware timestamps become naive timestamps, decimals become floats and
+    nested values become JSON text.
+    """
+    columns, nested = [], []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_nested(field.type):
+            nested.append(field.name)
+        elif pa.types.is_date(field.type):
+            column = column.cast(pa.timestamp("ns"))
+        elif pa.types.is_timestamp(field.type) and field.type.tz is not None:
+            column = column.cast(pa.timestamp(field.type.unit))
+        elif pa.types.is_decimal(field.type):
+            column = column.cast(pa.float64())
+        columns.append(column)
+    df = pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pandas()
+    for name in nested:
+        df[name] = df[name].map(lambda v: json.dumps(v.tolist() if hasattr(v, "tolist") else v, default=str)
+                                if v is not None else None)
+    return df
+
+
+def cast_chunk(chunk: pd.DataFrame, kinds: Dict[str, str]) -> pd.DataFrame:
+    """
+    Align a self-typed chunk (Parquet, JSON) with the kinds settled by the first pass:
+    the same columns in the same order, numbers widened, text as ``str`` values.
+    """
+    chunk = chunk.reindex(columns=list(kinds))
+    for name, kind in kinds.items():
+        ser = chunk[name]
+        if kind == "string":
+            ser = ser.astype(object)
+            chunk[name] = ser.where(ser.isna(), ser.astype(str))
+        elif kind == "datetime":
+            chunk[name] = pd.to_datetime(ser).astype("datetime64[ns]")
+        elif str(ser.dtype) != PANDAS_READ_DTYPES[kind]:
+            chunk[name] = ser.astype(PANDAS_READ_DTYPES[kind])
+    return chunk
+
+
+def read_csv_pandas(path: Path, kinds: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """Single-threaded CSV reader in fixed-size row chunks; gzip is inferred from the suffix."""
+    dtypes = {name: PANDAS_READ_DTYPES[kind] for name, kind in kinds.items()} if kinds else None
+    yield from pd.read_csv(path, chunksize=CHUNK_ROWS, dtype=dtypes)
+
+
+def read_csv_arrow(path: Path, kinds: Optional[Dict[str, str]] = None,
+                   spill: Optional[Path] = None) -> Iterator[pd.DataFrame]:
+    """
+    Block-parallel CSV reader: blocks are decompressed as a stream and parsed on
+    pyarrow's thread pool. Without ``kinds`` types are inferred from the first block,
+    except dates, which stay text so they go through the same format sniffing as pandas.
+    Raises ``pyarrow.ArrowInvalid`` when a later block does not fit the inferred types.
+    With ``spill`` the parsed batches are also written there as an Arrow IPC file, so a
+    second pass can read them with ``read_spilled`` instead of parsing the text again.
+    """
+    read_options = pacsv.ReadOptions(block_size=CSV_BLOCK_BYTES, use_threads=True)
+    column_types = {name: ARROW_READ_TYPES[kind] for name, kind in kinds.items()} if kinds else {}
+
+    def open_reader():
+        convert_options = pacsv.ConvertOptions(column_types=column_types, true_values=TRUE_VALUES,
+                                               false_values=FALSE_VALUES, strings_can_be_null=True)
+        return pacsv.open_csv(pa.input_stream(path, compression="detect"),
+                              read_options=read_options, convert_options=convert_options)
+
+    reader = open_reader()
+    if not kinds:
+        temporal = [f.name for f in reader.schema if pa.types.is_temporal(f.type)]
+        if temporal:
+            reader.close()
+            column_types = {name: pa.string() for name in temporal}
+            reader = open_reader()
+    writer = pa.ipc.new_file(str(spill), reader.schema) if spill is not None else None
+    try:
+        rows = 0
+        for batch in reader:
+            if batch.num_rows:
+                rows += batch.num_rows
+                if writer is not None:
+                    writer.write_batch(batch)
+                yield _arrow_to_pandas(batch)
+        if not rows:
+            # A header-only file still has its columns
+            empty = pa.RecordBatch.from_pylist([], schema=reader.schema)
+            if writer is not None:
+                writer.write_batch(empty)
+            yield _arrow_to_pandas(empty)
+    finally:
+        reader.close()
+        if writer is not None:
+            writer.close()
+
+
+def spill_fits(path: Path, kinds: Dict[str, str]) -> bool:
+    """
+    Whether batches spilled by ``read_csv_arrow`` can stand in for reading the CSV with
+    ``kinds``: every column read as text was parsed as text (booleans with nulls were not).
+    """
+    schema = pa.ipc.open_file(pa.memory_map(str(path))).schema
+    return set(schema.names) == set(kinds) and all(
+        kinds[field.name] != "string" or pa.types.is_string(field.type) or pa.types.is_null(field.type)
+        for field in schema)
+
+
+def read_spilled(path: Path, kinds: Dict[str, str]) -> Iterator[pd.DataFrame]:
+    """
+    Batches spilled by ``read_csv_arrow``, memory-mapped, with numbers widened to ``kinds``
+    (see ``spill_fits``). Nothing is parsed again.
+    """
+    reader = pa.ipc.open_file(pa.memory_map(str(path)))
+    for i in range(reader.num_record_batches):
+        chunk = _arrow_to_pandas(reader.get_batch(i))
+        for name, kind in kinds.items():
+            if kind != "string" and str(chunk[name].dtype) != PANDAS_READ_DTYPES[kind]:
+                chunk[name] = chunk[name].astype(PANDAS_READ_DTYPES[kind])
+        yield chunk[list(kinds)]
+
+
+def read_parquet(path: Path, kinds: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """Parquet uploads, one row-group batch at a time (one empty batch when there are no rows)."""
+    parquet = pq.ParquetFile(path)
+    batches = parquet.iter_batches(batch_size=CHUNK_ROWS) if parquet.metadata.num_rows else \
+        [pa.RecordBatch.from_pylist([], schema=parquet.schema_arrow)]
+    for batch in batches:
+        chunk = _arrow_to_pandas(batch)
+        yield cast_chunk(chunk, kinds) if kinds else chunk
+
+
+def read_jsonl(path: Path, kinds: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """JSON Lines uploads in row chunks; nested values are kept as JSON text."""
+    with pd.read_json(path, lines=True, chunksize=CHUNK_ROWS, dtype=False, precise_float=True,
+                      convert_dates=False, keep_default_dates=False) as reader:
+        for chunk in reader:
+            for name in chunk.columns:
+                if chunk[name].dtype == object:
+                    chunk[name] = chunk[name].map(_scalar_text)
+            yield cast_chunk(chunk, kinds) if kinds else chunk
+
+
+READERS: Dict[str, Callable[..., Iterator[pd.DataFrame]]] = {
+    "parquet": read_parquet,
+    "jsonl": read_jsonl,
+    "jsonl.gz": read_jsonl,
+}
+
+
+def csv_reader(engine: str) -> Callable[..., Iterator[pd.DataFrame]]:
+    return read_csv_arrow if engine == "arrow" else read_csv_pandas
+
+
+def iter_chunks(path: Path, fmt: str, kinds: Optional[Dict[str, str]] = None,
+                engine: str = CSV_ENGINE) -> Iterator[pd.DataFrame]:
+    """
+    Read a stored upload chunk by chunk. With ``kinds`` (column -> int/float/bool/string/datetime)
+    every chunk comes back with exactly those columns and types.
+    """
+    reader = csv_reader(engine) if fmt in ("csv", "csv.gz") else READERS[fmt]
+    yield from reader(path, kinds)
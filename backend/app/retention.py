@@ -0,0 +1,124 @@
+# backend/app/retention.py
+# Background sweeper enforcing a retention TTL and a disk quota on DATA_DIR
+import fcntl
+import os
+import threading
+import time
+from typing import IO, Any, Dict, Optional
+from app.data_utils import DATA_DIR, UPLOAD_DIR, get_catalog, stored_datasets, purge_dataset
+
+# Uploads interrupted mid-stream are dropped after this long
+STAGED_UPLOAD_TTL_SECONDS = 3600
+# Held by the one worker process whose sweeper runs; the others retry each interval
+SWEEPER_LOCK = DATA_DIR / ".retention-sweeper.lock"
+
+
+class RetentionSweeper:
+    """
+    Periodically evicts stored datasets. A dataset expires once none of its uploads has
+    been used for ``ttl_seconds``; while DATA_DIR is over ``quota_bytes`` the least
+    recently used datasets are evicted as well. Evicting a dataset drops every upload
+    (file_id) pointing at it. A zero TTL or quota disables that rule. Every worker
+    process starts one, but only the one holding ``SWEEPER_LOCK`` sweeps.
+    """
+
+    def __init__(self, ttl_seconds: float, quota_bytes: int, interval_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file: Optional[IO[str]] = None
+        self.last_sweep: Dict[str, Any] = {}
+
+    def sweep(self) -> Dict[str, Any]:
+        """Run one eviction pass and return what it removed."""
+        now = time.time()
+        datasets = stored_datasets()
+        catalogued = get_catalog().last_access()
+        # Files on disk the catalog does not know (interrupted ingest) age from their last write
+        last_access = {dataset_id: catalogued.get(dataset_id, entry["modified"]) for dataset_id, entry in datasets.items()}
+
+        evicted = []
+        if self.ttl_seconds:
+            evicted += [d for d, t in last_access.items() if now - t > self.ttl_seconds]
+        if self.quota_bytes:
+            total = sum(entry["bytes"] for d, entry in datasets.items() if d not in evicted)
+            for dataset_id in sorted(last_access, key=last_access.get):
+                if total <= self.quota_bytes:
+                    break
+                if dataset_id not in evicted:
+                    evicted.append(dataset_id)
+                    total -= datasets[dataset_id]["bytes"]
+
+        # Datasets used again since the snapshot above are kept
+        evicted = [d for d in evicted if purge_dataset(d, force=True, accessed_before=last_access[d])]
+        for path in UPLOAD_DIR.glob("*.part"):
+            if now - path.stat().st_mtime > STAGED_UPLOAD_TTL_SECONDS:
+                path.unlink(missing_ok=True)
+        for path in DATA_DIR.glob(".*.lock"):
+            if (path != SWEEPER_LOCK and path.name[1:-len(".lock")] not in datasets
+                    and now - path.stat().st_mtime > STAGED_UPLOAD_TTL_SECONDS):
+                path.unlink(missing_ok=True)
+
+        self.last_sweep = {
+            "at": now,
+            "evicted": evicted,
+            "freed_bytes": sum(datasets[d]["bytes"] for d in evicted)
+        }
+        if evicted:
+            print(f"Retention sweep evicted {len(evicted)} dataset(s), freed {self.last_sweep['freed_bytes']} bytes")
+        return self.last_sweep
+
+    def _acquire(self) -> bool:
+        """Whether this process holds the sweeper lock, taking it if no other worker does."""
+        if self._lock_file is None:
+            lock_file = open(SWEEPER_LOCK, "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            if not self._acquire():
+                continue
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Retention sweep failed: {e}")
+
+    def start(self) -> None:
+        """Start sweeping in a daemon thread (no-op when both rules are disabled)."""
+        if self._thread is not None or not (self.ttl_seconds or self.quota_bytes):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_file is not None:
+            # Closing the file releases the lock for another worker's sweeper
+            self._lock_file.close()
+            self._lock_file = None
+
+
+_sweeper = None
+
+def get_retention_sweeper() -> RetentionSweeper:
+    """Process-wide sweeper configured by RETENTION_DAYS, DATA_QUOTA_MB and SWEEP_INTERVAL_SECONDS."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = RetentionSweeper(
+            ttl_seconds=float(os.getenv("RETENTION_DAYS", "0")) * 86400,
+            quota_bytes=int(float(os.getenv("DATA_QUOTA_MB", "0")) * 1024 * 1024),
+            interval_seconds=float(os.getenv("SWEEP_INTERVAL_SECONDS", "600"))
+        )
+    return _sweeper
@@ -6,6 +6,7 @@ class RecommendRequest(BaseModel):
     goal: str
     insight: str = "Auto"
     file_id: Optional[str] = None
+    full_data: bool = False  # chart the full dataset instead of the persisted sample
 
 class RecommendResponse(BaseModel):
     vibe: str
@@ -17,6 +18,15 @@ class UploadResponse(BaseModel):
     file_id: str
     filename: str
     summary: Dict[str, Any]
+    deduplicated: bool = False  # identical bytes were already stored; artifacts are shared
+
+class AppendRequest(BaseModel):
+    rows: List[Dict[str, Any]]  # column -> value; columns must already exist
+
+class AppendResponse(BaseModel):
+    file_id: str
+    appended: int
+    summary: Dict[str, Any]
 
 class PreviewRequest(BaseModel):
     file_id: Optional[str] = None
@@ -25,6 +35,7 @@ class PreviewRequest(BaseModel):
     y_col: Optional[str] = None
     group_col: Optional[str] = None
     options: Optional[Dict[str, Any]] = {}
+    full_data: bool = False  # chart the full dataset instead of the persisted sample
 
 class PreviewResponse(BaseModel):
     chart_spec: Dict[str, Any]
@@ -0,0 +1,137 @@
+# backend/app/shared_cache.py
+# Cross-worker dataset cache backed by memory-mapped column files
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, List, Optional
+import numpy as np
+import pandas as pd
+
+DEFAULT_SHARED_CACHE_MB = 1024
+
+
+class SharedDatasetCache:
+    """
+    Dataset cache shared by every uvicorn worker on the host.
+
+    The first worker that needs a dataset writes each column once as a ``.npy`` file
+    into a shared directory (``/dev/shm`` keeps it in RAM). Every worker then attaches
+    with ``np.load(mmap_mode="r")`` and builds a DataFrame on top of the mapped
+    buffers without copying, so all processes share the same physical pages.
+    String and other object columns are stored as category codes and attach as
+    categoricals over the mapped codes, so only their categories are a per-process
+    copy (text columns of attached frames have the ``category`` dtype).
+
+    The directory is bounded by ``max_bytes``: once a new entry pushes it over, the
+    least recently attached entries (by the mtime of their ``meta.json``, touched on
+    every hit) are removed. Workers still holding mappings of them keep valid views.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, file_id: str, version: Any) -> Path:
+        token = "-".join(str(v) for v in version) if isinstance(version, tuple) else str(version)
+        return self.root / f"{file_id}@{token}"
+
+    def get(self, file_id: str, version: Any, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Attach read-only to a materialized dataset, or return None if no worker has written it yet."""
+        entry = self._entry_dir(file_id, version)
+        try:
+            with open(entry / "meta.json") as f:
+                meta = json.load(f)
+            os.utime(entry / "meta.json")  # marks the entry recently used
+            wanted = set(columns) if columns is not None else None
+            data = {}
+            for i, col in enumerate(meta["columns"]):
+                if wanted is not None and col["name"] not in wanted:
+                    continue
+                values = np.load(entry / f"{i}.npy", mmap_mode="r")
+                if col["kind"] == "category":
+                    categories = pd.read_parquet(entry / f"{i}.categories.parquet")["categories"]
+                    values = pd.Categorical.from_codes(values, categories=categories, ordered=col["ordered"])
+                data[col["name"]] = values
+            return pd.DataFrame(data, copy=False)
+        except FileNotFoundError:
+            return None
+
+    def put(self, file_id: str, version: Any, df: pd.DataFrame) -> None:
+        """Materialize a dataset once; concurrent writers race on an atomic rename and the loser backs off."""
+        entry = self._entry_dir(file_id, version)
+        if entry.exists():
+            return
+        # Codes and fixed-width arrays take about what the frame's buffers take
+        if int(df.memory_usage(deep=False).sum()) > self.max_bytes:
+            return
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        tmp.mkdir()
+        try:
+            meta = {"columns": []}
+            for i, name in enumerate(df.columns):
+                ser = df[name]
+                if not (isinstance(ser.dtype, pd.CategoricalDtype) or (isinstance(ser.dtype, np.dtype) and ser.dtype.kind in "biufcmM")):
+                    ser = ser.astype("category")
+                if isinstance(ser.dtype, pd.CategoricalDtype):
+                    pd.DataFrame({"categories": ser.cat.categories}).to_parquet(tmp / f"{i}.categories.parquet", index=False)
+                    np.save(tmp / f"{i}.npy", ser.cat.codes.to_numpy())
+                    meta["columns"].append({"name": name, "kind": "category", "ordered": bool(ser.cat.ordered)})
+                else:
+                    np.save(tmp / f"{i}.npy", ser.to_numpy())
+                    meta["columns"].append({"name": name, "kind": "array"})
+            meta["bytes"] = sum(path.stat().st_size for path in tmp.iterdir())
+            with open(tmp / "meta.json", "w") as f:
+                json.dump(meta, f)
+            try:
+                os.rename(tmp, entry)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)  # another worker won the race
+            self._remove_stale(file_id, keep=entry)
+            self._evict(keep=entry)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def invalidate(self, file_id: str) -> None:
+        """Drop every materialized version; workers still holding mappings keep valid views."""
+        self._remove_stale(file_id, keep=None)
+
+    def _evict(self, keep: Path) -> None:
+        """Remove the least recently used entries until the directory fits ``max_bytes``."""
+        entries = []
+        for entry in self.root.glob("*@*"):
+            try:
+                with open(entry / "meta.json") as f:
+                    size = json.load(f).get("bytes", 0)
+                entries.append((os.stat(entry / "meta.json").st_mtime, size, entry))
+            except (FileNotFoundError, ValueError):
+                continue  # removed by another worker meanwhile
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if entry != keep:
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+    def _remove_stale(self, file_id: str, keep: Optional[Path]) -> None:
+        for entry in self.root.glob(f"{file_id}@*"):
+            if entry != keep:
+                shutil.rmtree(entry, ignore_errors=True)
+
+
+_shared_cache = None
+
+def get_shared_cache() -> Optional[SharedDatasetCache]:
+    """Shared cache configured by SHARED_CACHE_DIR (bounded by SHARED_CACHE_MB), or None when cross-worker sharing is disabled."""
+    global _shared_cache
+    root = os.getenv("SHARED_CACHE_DIR")
+    if not root:
+        return None
+    if _shared_cache is None:
+        max_mb = float(os.getenv("SHARED_CACHE_MB", DEFAULT_SHARED_CACHE_MB))
+        _shared_cache = SharedDatasetCache(Path(root), int(max_mb * 1024 * 1024))
+    return _shared_cache
@@ -0,0 +1,257 @@
+# backend/app/sketches.py
+# Mergeable, serializable sketches behind the approximate analytics mode
+import base64
+import math
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 14
+TDIGEST_COMPRESSION = 200
+TOP_K_CAPACITY = 1024
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """Stable 64-bit hashes of the non-null values (the same across processes and restarts)."""
+    return pd.util.hash_pandas_object(values.dropna(), index=False).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Exact bit length of unsigned 64-bit integers."""
+    length = np.minimum(np.frexp(x.astype(np.float64))[1], 64).astype(np.int64)
+    # Values above 2**53 can round up to the next power of two when converted to float
+    over = (length > 0) & ((x >> np.maximum(length - 1, 0).astype(np.uint64)) == 0)
+    return length - over
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch: ``2**precision`` registers keep the longest run of leading
+    zeros seen among the hashes routed to them. The relative standard error of the
+    estimate is ``1.04 / sqrt(2**precision)`` (0.8% at the default precision).
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        hashes = hash_values(values)
+        if not len(hashes):
+            return
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        rank = (rest_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return float(raw)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+class TDigest:
+    """
+    Quantile sketch: values are kept as weighted centroids, small near the tails and
+    larger in the middle (the k1 scale function). Compression is vectorized: points
+    falling in the same unit interval of the scale function are merged.
+    """
+
+    def __init__(self, compression: int = TDIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def _add(self, means: np.ndarray, weights: np.ndarray) -> None:
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        left = (np.cumsum(weights) - weights) / total
+        scale = self.compression / (2 * math.pi) * np.arcsin(2 * left - 1)
+        cluster = np.floor(scale - scale[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def update(self, values: pd.Series) -> None:
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.min, self.max = min(self.min, float(values.min())), max(self.max, float(values.max()))
+        self._add(values, np.ones(len(values)))
+
+    def merge(self, other: "TDigest") -> None:
+        if not len(other.weights):
+            return
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._add(other.means, other.weights)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.weights):
+            return None
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        # Interpolate between centroid centers, anchored at the exact min and max
+        positions = np.r_[0.0, centers, total]
+        values = np.r_[self.min, self.means, self.max]
+        return float(np.interp(q * total, positions, values))
+
+    def rank_error(self, q: float) -> float:
+        """Bound on how far the rank of ``quantile(q)`` can be from ``q``: half the weight of its centroid."""
+        if not len(self.weights):
+            return 0.0
+        total = self.weights.sum()
+        index = min(int(np.searchsorted(np.cumsum(self.weights), q * total)), len(self.weights) - 1)
+        return float(self.weights[index] / 2 / total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"compression": self.compression, "means": self.means.tolist(), "weights": self.weights.tolist(),
+                "min": self.min if len(self.weights) else None, "max": self.max if len(self.weights) else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TDigest":
+        sketch = cls(data["compression"])
+        sketch.means = np.asarray(data["means"], dtype=np.float64)
+        sketch.weights = np.asarray(data["weights"], dtype=np.float64)
+        if len(sketch.weights):
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Weighted heavy hitters: at most ``capacity`` keys are tracked with their summed
+    weight and an error. A key missing from one of two merged summaries is counted
+    with that summary's smallest tracked weight (the most it can have had), which
+    becomes error, so each estimate overestimates the true non-negative sum by at
+    most its ``error`` and no key heavier than ``total / capacity`` is dropped.
+    """
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.float64)
+        self.errors = pd.Series(dtype=np.float64)
+        self.total = 0.0
+
+    def _floor(self) -> float:
+        """Most weight an untracked key can carry."""
+        return float(self.counts.min()) if len(self.counts) >= self.capacity else 0.0
+
+    def _merge(self, counts: pd.Series, errors: pd.Series, floor: float) -> None:
+        mine = self._floor()
+        keys = self.counts.index.append(counts.index).unique() if len(self.counts) else counts.index
+        merged = self.counts.reindex(keys, fill_value=mine) + counts.reindex(keys, fill_value=floor)
+        error = self.errors.reindex(keys, fill_value=mine) + errors.reindex(keys, fill_value=floor)
+        top = merged.sort_values(ascending=False, kind="stable").head(self.capacity)
+        self.counts, self.errors = top, error[top.index]
+
+    def update(self, keys: pd.Series, weights: pd.Series) -> None:
+        """Add ``weights`` summed per key; the chunk is aggregated exactly, then merged."""
+        sums = weights.groupby(keys, observed=True).sum().astype(np.float64).sort_values(ascending=False, kind="stable")
+        self.total += float(sums.sum())
+        floor = float(sums.iloc[self.capacity]) if len(sums) > self.capacity else 0.0
+        sums = sums.head(self.capacity)
+        self._merge(sums, pd.Series(0.0, index=sums.index), floor)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        self.total += other.total
+        self._merge(other.counts, other.errors, other._floor())
+
+    def top(self, k: int) -> List[Dict[str, Any]]:
+        """The ``k`` heaviest keys with their estimated sum and its maximum overestimate."""
+        top = self.counts.sort_values(ascending=False, kind="stable").head(k)
+        return [{"key": key, "estimate": float(count), "error": float(self.errors[key])} for key, count in top.items()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "total": self.total,
+                "items": [[key, float(count), float(self.errors[key])] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        sketch = cls(data["capacity"])
+        sketch.total = data["total"]
+        keys = pd.Index([key for key, _, _ in data["items"]], dtype=object)
+        sketch.counts = pd.Series([count for _, count, _ in data["items"]], index=keys, dtype=np.float64)
+        sketch.errors = pd.Series([error for _, _, error in data["items"]], index=keys, dtype=np.float64)
+        return sketch
+
+
+class DatasetSketches:
+    """
+    The sketches stored with a dataset: a HyperLogLog per column, a t-digest per
+    numeric column and, for the category and geography columns of the insights, the
+    heaviest groups by summed sales. Built chunk by chunk at ingest and updated on append.
+    """
+
+    def __init__(self, columns: List[str], numeric: List[str], groups: Dict[str, str]):
+        # ``groups``: group column -> the column whose sum ranks its values
+        self.groups = groups
+        self.distinct = {name: HyperLogLog() for name in columns}
+        self.quantiles = {name: TDigest() for name in numeric}
+        self.top = {name: SpaceSaving() for name in groups}
+
+    @classmethod
+    def for_frame(cls, df: pd.DataFrame, insight_columns: Dict[str, Optional[str]]) -> "DatasetSketches":
+        """Empty sketches for the columns of ``df`` (a zero-row frame with the stored dtypes is enough)."""
+        sales = insight_columns['sales']
+        groups = {insight_columns[role]: sales for role in ('category', 'geography') if sales and insight_columns[role]}
+        return cls(list(df.columns), list(df.select_dtypes(include=[np.number]).columns), groups)
+
+    def update(self, df: pd.DataFrame) -> None:
+        for name, sketch in self.distinct.items():
+            sketch.update(df[name])
+        for name, sketch in self.quantiles.items():
+            sketch.update(df[name])
+        for name, sketch in self.top.items():
+            sketch.update(df[name], df[self.groups[name]])
+
+    def merge(self, other: "DatasetSketches") -> None:
+        for attr in ("distinct", "quantiles", "top"):
+            for name, sketch in getattr(other, attr).items():
+                getattr(self, attr)[name].merge(sketch)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "groups": self.groups,
+            "distinct": {name: sketch.to_dict() for name, sketch in self.distinct.items()},
+            "quantiles": {name: sketch.to_dict() for name, sketch in self.quantiles.items()},
+            "top": {name: sketch.to_dict() for name, sketch in self.top.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DatasetSketches":
+        sketches = cls([], [], data["groups"])
+        sketches.distinct = {name: HyperLogLog.from_dict(d) for name, d in data["distinct"].items()}
+        sketches.quantiles = {name: TDigest.from_dict(d) for name, d in data["quantiles"].items()}
+        sketches.top = {name: SpaceSaving.from_dict(d) for name, d in data["top"].items()}
+        return sketches
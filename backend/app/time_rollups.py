@@ -0,0 +1,140 @@
+# backend/app/time_rollups.py
+# Mergeable day/week/month rollups of the numeric columns over a dataset's date column
+import os
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app.column_roles import measure_columns
+
+GRAINS = ('day', 'week', 'month')
+# Numeric columns rolled up per dataset (the sales and revenue columns come first)
+ROLLUP_MAX_COLUMNS = int(os.getenv("ROLLUP_MAX_COLUMNS", 64))
+# Line charts use the finest grain with at most this many periods
+ROLLUP_MAX_POINTS = 400
+# Periods an anomaly score compares against (the ones just before it)
+ANOMALY_WINDOW = 28
+# Rolling z-score beyond which a period is anomalous
+ANOMALY_ZSCORE = 3.0
+
+
+def _period_start(index: pd.DatetimeIndex, grain: str) -> pd.DatetimeIndex:
+    """Start of the day, week (Monday) or month each timestamp falls in."""
+    days = index.normalize()
+    if grain == 'week':
+        return days - pd.to_timedelta(days.dayofweek, unit='D')
+    if grain == 'month':
+        return days - pd.to_timedelta(days.day - 1, unit='D')
+    return days
+
+
+def rollup_columns(index: Dict[str, Any], columns: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Numeric columns of a role index worth rolling up: the sales measures, then the rest
+    (identifiers left out given the profile ``columns``, see ``column_roles.measure_columns``).
+    """
+    return measure_columns(index, columns)[:ROLLUP_MAX_COLUMNS]
+
+
+class TimeRollups:
+    """
+    Row counts plus per-column sums and non-null counts of ``numeric`` per day, week and
+    month of ``date_col``. Built chunk by chunk at ingest and updated on append; sums
+    and counts add up, so merged rollups equal the rollups of all rows and means are exact.
+    """
+
+    def __init__(self, date_col: str, numeric: List[str]):
+        self.date_col = date_col
+        self.numeric = numeric
+        empty = pd.DataFrame(columns=self._columns(), dtype=np.float64, index=pd.DatetimeIndex([], name='period'))
+        self.grains: Dict[str, pd.DataFrame] = {grain: empty for grain in GRAINS}
+
+    @classmethod
+    def for_roles(cls, index: Dict[str, Any],
+                  columns: Optional[Dict[str, Dict[str, Any]]] = None) -> Optional["TimeRollups"]:
+        """Empty rollups for the date column of a role index, or None when there is no date column."""
+        return cls(index['date'], rollup_columns(index, columns)) if index.get('date') else None
+
+    def _columns(self) -> List[str]:
+        return ['rows'] + [f'sum:{c}' for c in self.numeric] + [f'count:{c}' for c in self.numeric]
+
+    def _add(self, grain: str, frame: pd.DataFrame) -> None:
+        current = self.grains[grain]
+        merged = current.add(frame, fill_value=0) if len(current) else frame
+        merged.index.name = 'period'
+        self.grains[grain] = merged.sort_index()
+
+    def update(self, df: pd.DataFrame) -> None:
+        dates = df[self.date_col]
+        valid = dates.notna().to_numpy()
+        if not valid.any():
+            return
+        days = _period_start(pd.DatetimeIndex(dates[valid]), 'day')
+        grouped = df.loc[valid, self.numeric].astype(np.float64).groupby(days)
+        day = pd.concat([grouped.size().rename('rows'), grouped.sum().add_prefix('sum:'),
+                         grouped.count().add_prefix('count:')], axis=1).astype(np.float64)
+        self._add('day', day)
+        # Coarser grains are rolled up from the chunk's days rather than its rows
+        for grain in GRAINS[1:]:
+            self._add(grain, day.groupby(_period_start(day.index, grain)).sum())
+
+    def merge(self, other: "TimeRollups") -> None:
+        for grain in GRAINS:
+            if len(other.grains[grain]):
+                self._add(grain, other.grains[grain])
+
+    def complete(self, grain: str) -> bool:
+        """Whether the rows reach the last day of the latest ``grain`` period."""
+        days = self.grains['day'].index
+        if not len(days):
+            return False
+        last = days[-1:]
+        return _period_start(last + pd.Timedelta(days=1), grain)[0] != _period_start(last, grain)[0]
+
+    def grain_for(self, max_points: int = ROLLUP_MAX_POINTS) -> str:
+        """Finest grain with at most ``max_points`` periods."""
+        return next((grain for grain in GRAINS if len(self.grains[grain]) <= max_points), GRAINS[-1])
+
+    def series(self, column: Optional[str], grain: str, how: str = 'sum') -> pd.Series:
+        """Per-period ``sum``, ``mean`` or ``count`` of ``column`` (rows per period when None)."""
+        frame = self.grains[grain]
+        if column is None:
+            return frame['rows']
+        counts = frame[f'count:{column}']
+        if how == 'count':
+            return counts
+        # Periods where the column is all null have no sum or mean
+        sums = frame[f'sum:{column}'].where(counts > 0)
+        return sums / counts if how == 'mean' else sums
+
+    def anomalies(self, column: Optional[str], grain: str, window: int = ANOMALY_WINDOW,
+                  threshold: float = ANOMALY_ZSCORE) -> List[Dict[str, Any]]:
+        """
+        Periods whose ``column`` sum (row count when None) lies more than ``threshold``
+        standard deviations from the mean of the ``window`` periods before it, largest
+        deviation first. Scored for every period at once with rolling windows.
+        """
+        values = self.series(column, grain)
+        history = values.shift(1).rolling(window, min_periods=window)
+        spread = history.std()
+        zscores = ((values - history.mean()) / spread.where(spread > 0)).dropna()
+        flagged = zscores[zscores.abs() > threshold]
+        flagged = flagged.reindex(flagged.abs().sort_values(ascending=False, kind="stable").index)
+        return [{'period': period.strftime('%Y-%m-%d'), 'value': float(values[period]), 'zscore': round(float(z), 2)}
+                for period, z in flagged.items()]
+
+    def line_frame(self, column: str, grain: Optional[str] = None) -> pd.DataFrame:
+        """``column`` summed per period, as a frame with the date and value columns a line chart plots."""
+        values = self.series(column, grain or self.grain_for())
+        return pd.DataFrame({self.date_col: values.index, column: values.to_numpy()})
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.concat([frame.reset_index().assign(granularity=grain) for grain, frame in self.grains.items()],
+                         ignore_index=True)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, date_col: str) -> "TimeRollups":
+        numeric = [c[len('sum:'):] for c in frame.columns if c.startswith('sum:')]
+        rollups = cls(date_col, numeric)
+        for grain, part in frame.groupby('granularity'):
+            rollups.grains[grain] = part.drop(columns='granularity').set_index('period').sort_index()
+        return rollups